@@ -5,7 +5,7 @@ import os
 import json
 from datetime import datetime
 from pathlib import Path
-from openai import OpenAI, APIError, AuthenticationError, RateLimitError
+from openai import AsyncOpenAI, APIError, AuthenticationError, RateLimitError
 from typing import Optional
 
 
@@ -18,7 +18,7 @@ class ScheduleParseError(Exception):
 
 
 class AIService:
-    """Handles all OpenAI interactions for schedule parsing and conflict checking."""
+    """Handles all OpenAI interactions (async) for schedule parsing and conflict checking."""
     
     MODEL = "gpt-4o"
     PROMPTS_DIR = Path(__file__).parent / "prompt"
@@ -28,7 +28,7 @@ class AIService:
         if not api_key:
             raise ValueError("OPENAI_API_KEY environment variable is required")
         
-        self.client = OpenAI(api_key=api_key)
+        self.client = AsyncOpenAI(api_key=api_key)
         self._prompts = {}
         self._load_prompts()
         print("AIService initialized.")
@@ -44,10 +44,10 @@ class AIService:
             raise ValueError(f"Prompt '{name}' not found")
         return self._prompts[name]
     
-    def _call_openai(self, system_prompt: str, user_prompt: str, max_tokens: int = 256) -> dict:
+    async def _call_openai(self, system_prompt: str, user_prompt: str, max_tokens: int = 256) -> dict:
         """Make an OpenAI API call and return parsed JSON response."""
         try:
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model=self.MODEL,
                 max_tokens=max_tokens,
                 response_format={"type": "json_object"},
@@ -71,7 +71,7 @@ class AIService:
             print(f"JSON parse error: {e}")
             raise ScheduleParseError("Could not understand response.", field="general")
     
-    def parse_schedule(self, text: str, context: str = "") -> dict:
+    async def parse_schedule(self, text: str, context: str = "") -> dict:
         """
         Parse a schedule request from natural language.
         
@@ -111,7 +111,7 @@ Use this context to understand follow-up responses. For example:
             context_section=context_section
         )
         
-        result = self._call_openai(system_prompt, text.strip())
+        result = await self._call_openai(system_prompt, text.strip())
         print(f"LLM response: {result}")  # Debug
         
         # Handle partial/error responses
@@ -204,7 +204,7 @@ Use this context to understand follow-up responses. For example:
             'lang': result.get('lang', 'en')
         }
     
-    def check_conflict(
+    async def check_conflict(
         self,
         events: list[str],
         proposed_start: datetime,
@@ -237,12 +237,16 @@ Use this context to understand follow-up responses. For example:
         
         user_prompt = f"{proposed_start.strftime('%I:%M %p')} to {proposed_end.strftime('%I:%M %p')}"
         
-        result = self._call_openai(system_prompt, user_prompt, max_tokens=100)
+        result = await self._call_openai(system_prompt, user_prompt, max_tokens=100)
         print(f"Conflict check result: {result}")
         
         if result.get("conflict"):
             return False, result.get("event_title", "an existing event")
         return True, None
+    
+    async def close(self):
+        """Release the underlying HTTP connection pool."""
+        await self.client.close()
 
 
 # Global instance
@@ -0,0 +1,280 @@
+"""
+Audio Store - storage for generated audio: sharded on-disk with TTL and quota GC,
+or an in-memory LRU for short-lived replies.
+"""
+import os
+import time
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+
+class AudioStore:
+    """
+    Keeps generated audio under root/<shard>/<filename>. Shard directories (at most 256) are
+    never removed, so a writer never finds the directory it just prepared gone.
+    Files idle longer than the TTL are removed, then the oldest files are removed
+    until the store fits the disk quota. Protected files are never collected.
+    """
+
+    TTL_SECONDS = 60 * 60
+    MAX_BYTES = 200 * 1024 * 1024
+    GC_INTERVAL = 5 * 60
+    # Writes in progress (<name>.part, renamed into place when complete) are left alone
+    # until they're this old; older ones were orphaned by a failed write
+    PARTIAL_SUFFIX = '.part'
+    PARTIAL_GRACE_SECONDS = 10 * 60
+
+    def __init__(self, root: str, ttl_seconds: int = None, max_bytes: int = None):
+        self.root = Path(root)
+        self.ttl_seconds = ttl_seconds or int(os.getenv("AUDIO_TTL_SECONDS", self.TTL_SECONDS))
+        self.max_bytes = max_bytes or int(os.getenv("AUDIO_MAX_BYTES", self.MAX_BYTES))
+        self._protected: set[str] = set()
+        # relpath -> size of every stored file we know of, so overwrites aren't counted twice
+        self._sizes: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        self.files = 0
+        self.bytes = 0
+        self.gc_runs = 0
+        self.gc_files_removed = 0
+        self.gc_bytes_removed = 0
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def shard_for(filename: str) -> str:
+        return hashlib.md5(filename.encode('utf-8')).hexdigest()[:2]
+
+    def relpath_for(self, filename: str) -> str:
+        """Sharded path (relative to root) under which filename is stored."""
+        return f"{self.shard_for(filename)}/{filename}"
+
+    def path(self, relpath: str) -> Path:
+        return self.root / relpath
+
+    def exists(self, relpath: str) -> bool:
+        return self.path(relpath).exists()
+
+    def prepare(self, relpath: str) -> Path:
+        """Return the absolute path for relpath, creating its shard directory."""
+        path = self.path(relpath)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def record_write(self, relpath: str):
+        try:
+            size = self.path(relpath).stat().st_size
+        except OSError:
+            return
+        with self._lock:
+            previous = self._sizes.get(relpath)
+            self._sizes[relpath] = size
+            if previous is None:
+                self.files += 1
+            self.bytes += size - (previous or 0)
+
+    def touch(self, relpath: str):
+        """Mark a file as recently used so TTL collection keeps it."""
+        try:
+            os.utime(self.path(relpath))
+        except OSError:
+            pass
+
+    def remove(self, relpath: str):
+        path = self.path(relpath)
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except OSError:
+            return
+        with self._lock:
+            if self._sizes.pop(relpath, None) is not None:
+                self.files = max(0, self.files - 1)
+                self.bytes = max(0, self.bytes - size)
+
+    def protect(self, relpath: str):
+        with self._lock:
+            self._protected.add(relpath)
+
+    def unprotect(self, relpath: str):
+        with self._lock:
+            self._protected.discard(relpath)
+
+    def collect_garbage(self) -> tuple[int, int]:
+        """
+        Remove expired files, then oldest files until under quota.
+        Partial writes are skipped unless abandoned (older than PARTIAL_GRACE_SECONDS).
+        Returns (files_removed, bytes_removed).
+        """
+        now = time.time()
+        with self._lock:
+            protected = set(self._protected)
+
+        entries = []
+        orphans = []
+        for path in self.root.rglob('*'):
+            try:
+                if not path.is_file():
+                    continue
+                stat = path.stat()
+            except OSError:
+                continue
+            if path.name.endswith(self.PARTIAL_SUFFIX):
+                if now - stat.st_mtime > self.PARTIAL_GRACE_SECONDS:
+                    orphans.append(path)
+                continue
+            relpath = path.relative_to(self.root).as_posix()
+            entries.append((stat.st_mtime, stat.st_size, path, relpath))
+
+        for path in orphans:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+        entries.sort()
+        total_bytes = sum(size for _, size, _, _ in entries)
+        removed_files = 0
+        removed_bytes = 0
+        sizes = {}
+
+        for mtime, size, path, relpath in entries:
+            sizes[relpath] = size
+            if relpath in protected:
+                continue
+            expired = now - mtime > self.ttl_seconds
+            if not expired and total_bytes - removed_bytes <= self.max_bytes:
+                continue
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            del sizes[relpath]
+            removed_files += 1
+            removed_bytes += size
+
+        with self._lock:
+            self._sizes = sizes
+            self.files = len(sizes)
+            self.bytes = sum(sizes.values())
+            self.gc_runs += 1
+            self.gc_files_removed += removed_files
+            self.gc_bytes_removed += removed_bytes
+
+        if removed_files:
+            print(f"Audio GC removed {removed_files} files ({removed_bytes} bytes)")
+        return removed_files, removed_bytes
+
+    async def run_gc(self, interval: int = None):
+        """Background loop: collect garbage every interval seconds until cancelled."""
+        interval = interval or self.GC_INTERVAL
+        while True:
+            try:
+                await asyncio.to_thread(self.collect_garbage)
+            except Exception as e:
+                print(f"Audio GC error: {e}")
+            await asyncio.sleep(interval)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "files": self.files,
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "protected": len(self._protected),
+                "gc_runs": self.gc_runs,
+                "gc_files_removed": self.gc_files_removed,
+                "gc_bytes_removed": self.gc_bytes_removed,
+            }
+
+
+class MemoryAudioStore:
+    """
+    RAM-backed audio store: bytes kept in an LRU bounded by entry count and total size,
+    with a TTL on idle entries. Pinned entries are never evicted.
+    """
+
+    MAX_ENTRIES = 512
+    MAX_BYTES = 64 * 1024 * 1024
+    TTL_SECONDS = 15 * 60
+
+    def __init__(self, max_entries: int = None, max_bytes: int = None, ttl_seconds: int = None):
+        self.max_entries = max_entries or self.MAX_ENTRIES
+        self.max_bytes = max_bytes or int(os.getenv("AUDIO_MEMORY_MAX_BYTES", self.MAX_BYTES))
+        self.ttl_seconds = ttl_seconds or int(os.getenv("AUDIO_MEMORY_TTL_SECONDS", self.TTL_SECONDS))
+        self._entries: OrderedDict[str, tuple[bytes, float]] = OrderedDict()
+        self._pinned: set[str] = set()
+        self._lock = threading.Lock()
+
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, audio_id: str, record_stats: bool = True) -> bytes | None:
+        with self._lock:
+            entry = self._entries.get(audio_id)
+            if entry is not None and audio_id not in self._pinned \
+                    and time.monotonic() - entry[1] > self.ttl_seconds:
+                self._drop(audio_id)
+                entry = None
+            if entry is None:
+                self.misses += record_stats
+                return None
+
+            self._entries[audio_id] = (entry[0], time.monotonic())
+            self._entries.move_to_end(audio_id)
+            self.hits += record_stats
+            return entry[0]
+
+    def put(self, audio_id: str, data: bytes):
+        with self._lock:
+            if audio_id in self._entries:
+                self._drop(audio_id)
+            self._entries[audio_id] = (data, time.monotonic())
+            self.bytes += len(data)
+            self._evict()
+
+    def pin(self, audio_id: str):
+        with self._lock:
+            self._pinned.add(audio_id)
+
+    def unpin_all(self):
+        with self._lock:
+            self._pinned.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "pinned": len(self._pinned),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "evictions": self.evictions,
+            }
+
+    def _drop(self, audio_id: str):
+        data, _ = self._entries.pop(audio_id)
+        self.bytes -= len(data)
+
+    def _evict(self):
+        now = time.monotonic()
+        for audio_id in list(self._entries):
+            over_limit = len(self._entries) > self.max_entries or self.bytes > self.max_bytes
+            if audio_id in self._pinned:
+                continue
+            expired = now - self._entries[audio_id][1] > self.ttl_seconds
+            if not (expired or over_limit):
+                # Entries are in LRU order, so nothing after this one is idle for longer
+                break
+            self._drop(audio_id)
+            self.evictions += 1
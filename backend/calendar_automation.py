@@ -2,35 +2,153 @@
 Google Calendar Automation using Playwright.
 """
 import asyncio
+import json
 import os
+import re
+import time
 import urllib.parse
-from datetime import datetime
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta
 from pathlib import Path
-from playwright.async_api import async_playwright, Browser, Page, BrowserContext
+from playwright.async_api import async_playwright, Browser, Page, BrowserContext, Response
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 from typing import Optional
 
+from calendar_event import CalendarEvent, parse_header_date, parse_label_date
+from page_pool import PagePool, Priority
+from page_readiness import PageReadiness
+from resource_policy import ResourcePolicy
+
 
 class CalendarAutomation:
     
     STORAGE_STATE_PATH = "auth/google_auth_state.json"
     GOOGLE_CALENDAR_URL = "https://calendar.google.com/calendar"
+    EVENT_CACHE_TTL = 60  # seconds
+    
+    # Selectors for event elements (fallback chain: the first one that matches wins)
+    EVENT_SELECTORS = [
+        '[data-eventid]',
+        '[role="button"][data-eventchip]',
+        '[data-eventchip="true"]',
+    ]
+    # Dates of the columns actually on screen (week view), read from the grid's column headers
+    _SHOWN_DAYS_JS = """
+        () => {
+            const main = document.querySelector('[role="main"]');
+            if (!main) return [];
+            return Array.from(main.querySelectorAll('[role="columnheader"]'), el => {
+                const keyed = el.hasAttribute('data-datekey') ? el : el.querySelector('[data-datekey]');
+                return {
+                    key: keyed ? keyed.getAttribute('data-datekey') : null,
+                    label: el.getAttribute('aria-label') || el.innerText || '',
+                };
+            });
+        }
+    """
+    _EXTRACT_EVENTS_JS = """
+        (selectors) => {
+            const days = (%s)();
+            for (const selector of selectors) {
+                const elements = document.querySelectorAll(selector);
+                if (elements.length) {
+                    return {
+                        selector,
+                        days,
+                        events: Array.from(elements, el => ({
+                            id: el.getAttribute('data-eventid'),
+                            label: el.getAttribute('aria-label') || el.innerText || '',
+                        })),
+                    };
+                }
+            }
+            return {selector: null, days, events: []};
+        }
+    """ % _SHOWN_DAYS_JS.strip()
+    
+    # Paths of the request the editor issues when an event is saved (exact path-suffix match)
+    SAVE_PATHS = ('/sync.sync', '/event')
+    SAVE_CONFIRM_TIMEOUT = 10000  # ms
+    # Google event ids are 26 base32hex characters; eids in URLs are base64 of "<id> <calendar>"
+    _SAVED_EVENT_ID = re.compile(r'"([a-v0-9]{26})(?:_\d{8}T\d{6}Z)?"')
+    
+    PREVIEW_CACHE_SIZE = 32  # day-view screenshots kept in memory
+    SHOW_AFTER_CREATE = True  # open the viewer on a new event's date once it is saved
     
-    def __init__(self):
+    def __init__(self, event_cache_ttl: int = None):
         self.browser: Browser = None
         self.context: BrowserContext = None
         self.page: Page = None
         self.playwright = None
         self._is_logged_in = False
-        self._is_headless = True
+        self._worker_headless = True
+        
+        # Worker browser: self.page checks the session, browser jobs lease pool pages
+        self.pages = PagePool()
+        self._browser_lock = asyncio.Lock()
+        # Login polls overlap; only one may save the session and relaunch the worker
+        self._login_lock = asyncio.Lock()
+        
+        # Viewer browser: a visible window for login and for showing the user their calendar.
+        # Launched once and then only navigated, so it never costs a browser restart.
+        self.viewer_browser: Browser = None
+        self.viewer_context: BrowserContext = None
+        self.viewer_page: Page = None
+        self._viewer_lock = asyncio.Lock()
+        self.show_after_create = os.getenv(
+            "SHOW_AFTER_CREATE", str(self.SHOW_AFTER_CREATE)
+        ).lower() in ("1", "true", "yes")
+        # Fire-and-forget viewer navigations; referenced here so they aren't garbage collected
+        self._background_tasks: set[asyncio.Task] = set()
+        self.readiness = PageReadiness(self.EVENT_SELECTORS)
+        self.resources = ResourcePolicy()
+        
+        # Per-day scrape results: date -> (events, expires_at)
+        self.event_cache_ttl = event_cache_ttl if event_cache_ttl is not None else int(
+            os.getenv("EVENT_CACHE_TTL", self.EVENT_CACHE_TTL)
+        )
+        self._event_cache: dict[date, tuple[list[CalendarEvent], float]] = {}
+        self.event_cache_hits = 0
+        self.event_cache_misses = 0
+        
+        # DOM extraction timing (one page.evaluate per scrape)
+        self.extractions = 0
+        self.extracted_events = 0
+        self.extract_ms_total = 0.0
+        self.extract_ms_max = 0.0
+        self.extract_ms_last = 0.0
+        
+        # Day-view screenshots: date -> (PNG bytes, expires_at), least recently used first.
+        # Dropped when they expire (event_cache_ttl) or when that day's events are rewritten.
+        self._preview_cache: OrderedDict[date, tuple[bytes, float]] = OrderedDict()
+        self._preview_inflight: dict[date, asyncio.Task] = {}
+        # Bumped when previews are dropped, so an in-flight capture of that day isn't cached:
+        # the generation covers every day, the per-day epochs one day each
+        self._preview_generation = 0
+        self._preview_day_epochs: dict[date, int] = {}
+        # Unblocked context for previews when the worker context aborts images and fonts
+        self.preview_context: BrowserContext = None
+        self._preview_lock = asyncio.Lock()
+        self.preview_hits = 0
+        self.preview_captures = 0
+        self.preview_failures = 0
+        
+        # Event saves, confirmed by the calendar's save response
+        self.saves = 0
+        self.saves_confirmed = 0
+        self.saves_with_id = 0
+        self.save_ms_total = 0.0
+        self.save_ms_last = 0.0
         
         Path("auth").mkdir(exist_ok=True)
     
     async def initialize(self, headless: bool = True) -> bool:
         self.playwright = await async_playwright().start()
         
+        self._worker_headless = headless
         if self._has_saved_state():
             try:
-                self._is_headless = headless
                 self.browser = await self.playwright.chromium.launch(
                     headless=headless,
                     args=['--disable-blink-features=AutomationControlled']
@@ -40,9 +158,11 @@ class CalendarAutomation:
                     storage_state=self.STORAGE_STATE_PATH,
                     viewport={'width': 1280, 'height': 800}
                 )
+                await self.resources.attach(self.context, block=headless)
                 self.page = await self.context.new_page()
+                await self.pages.bind(self.context)
                 
-                await self.page.goto(self.GOOGLE_CALENDAR_URL, wait_until='domcontentloaded', timeout=15000)
+                await self._goto(self.GOOGLE_CALENDAR_URL, wait_until='domcontentloaded', timeout=15000)
                 
                 if 'calendar.google.com' in self.page.url and 'accounts.google.com' not in self.page.url:
                     self._is_logged_in = True
@@ -62,204 +182,684 @@ class CalendarAutomation:
         return False
     
     async def start_manual_login(self) -> str:
-        if self.browser is None:
-            self.browser = await self.playwright.chromium.launch(
-                headless=False,
-                args=['--disable-blink-features=AutomationControlled']
-            )
-        
-        self._is_headless = False
-        await self._close_context()
-        
-        self.context = await self.browser.new_context(
-            viewport={'width': 1280, 'height': 800}
-        )
-        self.page = await self.context.new_page()
-        
-        await self.page.goto(self.GOOGLE_CALENDAR_URL, wait_until='domcontentloaded', timeout=30000)
+        """Open the viewer window on the sign-in page; it stays open as the viewer afterwards."""
+        async with self._viewer_lock:
+            await self._close_viewer()
+            await self._launch_viewer(with_state=False)
+            await self._goto(self.GOOGLE_CALENDAR_URL, page=self.viewer_page, wait_until='domcontentloaded', timeout=30000)
         
         print("Please complete login in the browser window")
         return "Please complete login in the browser window."
     
     async def check_login_status(self) -> bool:
-        if self.page is None:
-            return False
+        if self._is_logged_in:
+            return True
         
-        try:
-            current_url = self.page.url
-            
-            if 'calendar.google.com' in current_url and 'accounts.google.com' not in current_url:
-                print("Login detected, saving state...")
-                await self._save_login_state()
-                await self._switch_to_headless()
-                self._is_logged_in = True
+        async with self._login_lock:
+            # A poll that waited on the lock finds the login already handled
+            if self._is_logged_in:
                 return True
+            if self.viewer_page is None or self.viewer_page.is_closed():
+                return False
             
-            return False
-        except Exception as e:
-            print(f"check_login_status error: {e}")
-            return False
-    
-    async def navigate_to_date(self, target_date: datetime) -> bool:
-        if not self._is_logged_in:
-            return False
-        
-        for attempt in range(2):
             try:
-                await self._ensure_browser()
-                date_str = target_date.strftime("%Y/%m/%d")
-                calendar_url = f"{self.GOOGLE_CALENDAR_URL}/r/day/{date_str}"
+                current_url = self.viewer_page.url
                 
-                await self.page.goto(calendar_url, wait_until='domcontentloaded', timeout=15000)
-                await asyncio.sleep(1)
+                if 'calendar.google.com' in current_url and 'accounts.google.com' not in current_url:
+                    print("Login detected, saving state...")
+                    await self._save_login_state(self.viewer_context)
+                    # The worker has to pick up the new session; nothing can be running before login
+                    async with self.pages.exclusive():
+                        await self._reconnect()
+                    self._is_logged_in = True
+                    return True
                 
-                print(f"Navigated to {date_str}")
-                return True
+                return False
             except Exception as e:
-                print(f"Error navigating to date (attempt {attempt + 1}): {e}")
-                if attempt == 0:
-                    await self._reconnect(headless=self._is_headless)
-                else:
-                    return False
-        return False
+                print(f"check_login_status error: {e}")
+                return False
+    
+    async def navigate_to_date(self, target_date: datetime, view: str = 'day') -> bool:
+        """Load the day (or week) view containing target_date in the viewer window."""
+        if not self._is_logged_in:
+            return False
+        
+        async with self._viewer_lock:
+            for attempt in range(2):
+                try:
+                    await self._ensure_viewer()
+                    await self._load_view(self.viewer_page, target_date, view)
+                    await self.viewer_page.bring_to_front()
+                    return True
+                except Exception as e:
+                    print(f"Error navigating to date (attempt {attempt + 1}): {e}")
+                    if attempt == 0:
+                        # Only the viewer is relaunched; the worker and its jobs are untouched
+                        await self._close_viewer()
+            return False
+    
+    async def _load_view(self, page: Page, target_date: datetime, view: str = 'day'):
+        """Navigate a page to a view and wait for the grid. Raises on failure."""
+        date_str = target_date.strftime("%Y/%m/%d")
+        calendar_url = f"{self.GOOGLE_CALENDAR_URL}/r/{view}/{date_str}"
+        
+        await self._goto(calendar_url, page=page, wait_until='domcontentloaded', timeout=15000)
+        if not await self.readiness.wait_for_grid(page):
+            # e.g. an expired session redirected to the sign-in page: reading it would look like a free day
+            raise RuntimeError(f"Calendar grid never rendered for {date_str} (at {page.url})")
+        
+        print(f"Navigated to {date_str}")
 
-    async def get_events_for_date(self, target_date: datetime) -> list[str]:
+    async def get_events_for_date(
+        self,
+        target_date: datetime,
+        priority: Priority = Priority.READ
+    ) -> Optional[list[CalendarEvent]]:
         """
-        Fetch all event descriptions from the calendar for a given date.
-        Returns a list of raw event text strings (for AI processing).
+        Fetch all events from the calendar for a given date.
+        Served from the per-day cache when fresh; otherwise scraped (at priority) and cached.
+        Returns None if the day couldn't be read.
         """
         if not self._is_logged_in:
-            return []
+            return None
         
-        # Multiple selectors for event elements (fallback chain)
-        event_selectors = [
-            '[data-eventid]',
-            '[role="button"][data-eventchip]',
-            '[data-eventchip="true"]',
-        ]
+        day = target_date.date()
+        cached = self._event_cache.get(day)
+        if cached and time.monotonic() < cached[1]:
+            self.event_cache_hits += 1
+            print(f"Event cache hit for {day}")
+            return list(cached[0])
+        
+        self.event_cache_misses += 1
+        events = await self.refresh_events_for_date(target_date, priority=priority)
+        return list(events) if events is not None else None
+    
+    async def refresh_events_for_date(
+        self,
+        target_date: datetime,
+        ttl: float = None,
+        priority: Priority = Priority.READ
+    ) -> Optional[list[CalendarEvent]]:
+        """
+        Scrape a date unconditionally and cache the result for ttl seconds
+        (default event_cache_ttl). Returns None if scraping failed.
+        Background callers pass Priority.BACKGROUND so live requests get pages first.
+        """
+        if not self._is_logged_in:
+            return None
         
+        events = await self._scrape_events_for_date(target_date, priority)
+        if events is None:
+            return None
+        
+        ttl = ttl if ttl is not None else self.event_cache_ttl
+        self._event_cache[target_date.date()] = (events, time.monotonic() + ttl)
+        self._drop_preview(target_date.date())
+        return events
+    
+    async def refresh_events_for_range(
+        self,
+        start: datetime,
+        end: datetime,
+        ttl: float = None,
+        priority: Priority = Priority.READ
+    ) -> dict[date, list[CalendarEvent]]:
+        """
+        Scrape start..end (inclusive) from the week view, one navigation per week,
+        and cache every day the view actually showed (read from its column headers).
+        Weeks whose shown days or labels can't be read fall back to day-view scraping.
+        Days that fail are left out of the result.
+        """
+        if not self._is_logged_in:
+            return {}
+        
+        ttl = ttl if ttl is not None else self.event_cache_ttl
+        result = {}
+        remaining = self._days_between(start, end)
+        
+        while remaining:
+            anchor = self._as_datetime(remaining[0])
+            per_day = None
+            scraped = await self._scrape_labels(anchor, 'week', priority)
+            if scraped is not None and scraped[1]:
+                per_day = self._split_by_day(*scraped)
+            
+            if per_day is None or remaining[0] not in per_day:
+                # Don't guess which days the week showed: read the next seven one by one
+                print(f"Week view unusable for {remaining[0]}, falling back to day view")
+                horizon = remaining[0] + timedelta(days=7)
+                done = [day for day in remaining if day < horizon]
+                for day in done:
+                    events = await self.refresh_events_for_date(self._as_datetime(day), ttl, priority)
+                    if events is not None:
+                        result[day] = events
+            else:
+                expires_at = time.monotonic() + ttl
+                for day, events in per_day.items():
+                    self._event_cache[day] = (events, expires_at)
+                    self._drop_preview(day)
+                result.update(per_day)
+                done = list(per_day)
+                print(f"Extracted {sum(len(e) for e in per_day.values())} events for week of {min(per_day)}")
+            
+            remaining = [day for day in remaining if day not in done]
+        
+        return {day: events for day, events in result.items() if start.date() <= day <= end.date()}
+    
+    @staticmethod
+    def _parse_shown_days(headers: list[dict], near: date) -> list[date]:
+        """
+        Dates of the on-screen columns, from each header's data-datekey
+        ((year - 1970) << 9 | month << 5 | day) or else its label. Empty if any can't be read.
+        """
+        days = []
+        for header in headers:
+            day = None
+            key = header.get('key')
+            if key and key.isdigit():
+                value = int(key)
+                try:
+                    day = date(1970 + (value >> 9), (value >> 5) & 15, value & 31)
+                except ValueError:
+                    day = None
+                if day is not None and abs((day - near).days) > 7:
+                    day = None  # Not the encoding we expect
+            if day is None:
+                day = parse_header_date(header.get('label') or '', near)
+            if day is None:
+                return []
+            days.append(day)
+        return sorted(set(days))
+    
+    @staticmethod
+    def _split_by_day(
+        labels: list[tuple[Optional[str], str]],
+        shown_days: list[date]
+    ) -> Optional[dict[date, list[CalendarEvent]]]:
+        """Assign week-view labels to the shown days by the date in each label; None if any label has no date."""
+        per_day = {day: [] for day in shown_days}
+        for event_id, text in labels:
+            day = parse_label_date(text)
+            if day is None:
+                return None
+            if day in per_day:
+                per_day[day].append(CalendarEvent.from_label(text, CalendarAutomation._as_datetime(day), event_id))
+        return per_day
+    
+    @staticmethod
+    def _days_between(start: datetime, end: datetime) -> list[date]:
+        return [start.date() + timedelta(days=i) for i in range((end.date() - start.date()).days + 1)]
+    
+    @staticmethod
+    def _as_datetime(day: date) -> datetime:
+        return datetime(day.year, day.month, day.day)
+    
+    def scrape_stats(self) -> dict:
+        return {
+            "extractions": self.extractions,
+            "events": self.extracted_events,
+            "avg_ms": round(self.extract_ms_total / self.extractions, 2) if self.extractions else 0.0,
+            "max_ms": round(self.extract_ms_max, 2),
+            "last_ms": round(self.extract_ms_last, 2),
+        }
+    
+    def _record_extraction(self, seconds: float, event_count: int):
+        ms = seconds * 1000
+        self.extractions += 1
+        self.extracted_events += event_count
+        self.extract_ms_total += ms
+        self.extract_ms_max = max(self.extract_ms_max, ms)
+        self.extract_ms_last = ms
+        print(f"Extracted {event_count} events in {ms:.1f}ms")
+    
+    def invalidate_events(self, target_date: datetime = None):
+        """Drop cached events for one date, or for every date when none is given."""
+        if target_date is None:
+            self._event_cache.clear()
+            self._preview_cache.clear()
+            self._preview_day_epochs.clear()
+            self._preview_generation += 1
+        else:
+            self._event_cache.pop(target_date.date(), None)
+            self._drop_preview(target_date.date())
+    
+    def event_cache_stats(self) -> dict:
+        total = self.event_cache_hits + self.event_cache_misses
+        return {
+            "days": len(self._event_cache),
+            "ttl_seconds": self.event_cache_ttl,
+            "hits": self.event_cache_hits,
+            "misses": self.event_cache_misses,
+            "hit_rate": round(self.event_cache_hits / total, 3) if total else 0.0,
+        }
+    
+    async def _scrape_events_for_date(
+        self,
+        target_date: datetime,
+        priority: Priority = Priority.READ
+    ) -> Optional[list[CalendarEvent]]:
+        """
+        Scrape the day view for a date. Labels are parsed into CalendarEvent records here.
+        Returns None if scraping failed (so the failure is not cached).
+        """
+        scraped = await self._scrape_labels(target_date, priority=priority)
+        if scraped is None:
+            return None
+        labels = scraped[0]
+        
+        events = [CalendarEvent.from_label(text, target_date, event_id) for event_id, text in labels]
+        print(f"Extracted {len(events)} events for {target_date.strftime('%Y-%m-%d')}")
+        return events
+    
+    async def _scrape_labels(
+        self,
+        target_date: datetime,
+        view: str = 'day',
+        priority: Priority = Priority.READ
+    ) -> Optional[tuple[list[tuple[Optional[str], str]], list[date]]]:
+        """
+        Navigate to a view and return ((event_id, label) for every event chip, shown_days).
+        shown_days is empty if the week view's column dates couldn't be read.
+        Returns None if scraping failed.
+        """
         for attempt in range(2):
             try:
                 await self._ensure_browser()
-                await self.navigate_to_date(target_date)
-                await asyncio.sleep(0.5)  # Allow events to render
-                
-                # Try each selector until we find events
-                event_elements = []
-                for selector in event_selectors:
-                    try:
-                        event_elements = await self.page.query_selector_all(selector)
-                        if event_elements:
-                            print(f"Found {len(event_elements)} events using selector: {selector}")
-                            break
-                    except Exception:
-                        continue
+                async with self.pages.lease(priority) as page:
+                    await self._load_view(page, target_date, view)
+                    
+                    # One round trip: every selector and attribute is read inside the page
+                    started = time.perf_counter()
+                    extracted = await page.evaluate(self._EXTRACT_EVENTS_JS, self.EVENT_SELECTORS)
+                    # Only the evaluate round trip: navigation and the page's release are not extraction cost
+                    evaluate_seconds = time.perf_counter() - started
+                self._record_extraction(evaluate_seconds, len(extracted['events']))
+                if extracted['selector']:
+                    print(f"Found {len(extracted['events'])} events using selector: {extracted['selector']}")
                 
-                events = []
-                for element in event_elements:
-                    try:
-                        text = await element.get_attribute('aria-label')
-                        if not text:
-                            text = await element.inner_text()
-                        if text and text.strip():
-                            events.append(text.strip())
-                    except Exception as e:
-                        print(f"Error extracting event text: {e}")
+                labels = []
+                seen_ids = set()
+                for event in extracted['events']:
+                    event_id, text = event['id'], (event['label'] or '').strip()
+                    if not text or (event_id and event_id in seen_ids):
                         continue
+                    seen_ids.add(event_id)
+                    labels.append((event_id, text))
                 
-                print(f"Extracted {len(events)} events for {target_date.strftime('%Y-%m-%d')}")
-                return events
+                if view == 'day':
+                    shown_days = [target_date.date()]
+                else:
+                    shown_days = self._parse_shown_days(extracted['days'], target_date.date())
+                return labels, shown_days
                 
             except Exception as e:
                 print(f"Error fetching events (attempt {attempt + 1}): {e}")
                 if attempt == 0:
-                    await self._reconnect(headless=self._is_headless)
+                    await self._recover()
         
-        return []
+        return None
 
     async def show_calendar_date(self, target_date: datetime) -> bool:
-        """Switch to visible mode and navigate to a date (for user review)."""
+        """Show a date in the visible viewer window (for user review). Costs a navigation, not a relaunch."""
         try:
-            await self._switch_to_visible()
-            await self.navigate_to_date(target_date)
-            return True
+            return await self.navigate_to_date(target_date)
         except Exception as e:
             print(f"Error showing calendar: {e}")
             return False
 
-    async def create_event(self, title: str, start_time: datetime, end_time: datetime) -> tuple[bool, str]:
+    async def get_day_preview(self, target_date: datetime) -> Optional[bytes]:
+        """
+        PNG of the day view, captured on a headless pool page (no visible browser involved).
+        Cached per date for event_cache_ttl, or until that day is rescraped or written to;
+        concurrent callers share one capture.
+        """
         if not self._is_logged_in:
-            return False
+            return None
+        
+        image = self._cached_preview(target_date.date())
+        if image is not None:
+            self.preview_hits += 1
+            return image
         
+        return await asyncio.shield(self._preview_task(target_date))
+    
+    def prefetch_day_preview(self, target_date: datetime):
+        """Start capturing a day preview in the background so a following request finds it ready."""
+        if self._is_logged_in and self._cached_preview(target_date.date()) is None:
+            self._preview_task(target_date)
+    
+    def _cached_preview(self, day: date) -> Optional[bytes]:
+        cached = self._preview_cache.get(day)
+        if cached is None:
+            return None
+        if time.monotonic() >= cached[1]:
+            del self._preview_cache[day]
+            return None
+        self._preview_cache.move_to_end(day)
+        return cached[0]
+    
+    def _drop_preview(self, day: date):
+        """Forget a day's screenshot, including one still being captured, after its events change."""
+        self._preview_cache.pop(day, None)
+        self._preview_day_epochs[day] = self._preview_day_epochs.get(day, 0) + 1
+    
+    def _preview_epoch(self, day: date) -> tuple[int, int]:
+        return self._preview_generation, self._preview_day_epochs.get(day, 0)
+    
+    def _preview_task(self, target_date: datetime) -> asyncio.Task:
+        day = target_date.date()
+        task = self._preview_inflight.get(day)
+        if task is None:
+            task = asyncio.create_task(self._capture_preview(target_date))
+            self._preview_inflight[day] = task
+            task.add_done_callback(lambda _: self._preview_inflight.pop(day, None))
+        return task
+    
+    async def _capture_preview(self, target_date: datetime) -> Optional[bytes]:
+        day = target_date.date()
+        epoch = self._preview_epoch(day)
         for attempt in range(2):
             try:
                 await self._ensure_browser()
+                async with self._preview_page() as page:
+                    await self._load_view(page, target_date)
+                    image = await page.locator('[role="main"]').screenshot(type='png')
                 
-                start_str = start_time.strftime("%Y%m%dT%H%M%S")
-                end_str = end_time.strftime("%Y%m%dT%H%M%S")
-                encoded_title = urllib.parse.quote(title)
-                
-                create_url = (
-                    f"https://calendar.google.com/calendar/render"
-                    f"?action=TEMPLATE"
-                    f"&text={encoded_title}"
-                    f"&dates={start_str}/{end_str}"
+                self.preview_captures += 1
+                if epoch == self._preview_epoch(day):
+                    self._preview_cache[day] = (image, time.monotonic() + self.event_cache_ttl)
+                while len(self._preview_cache) > self.PREVIEW_CACHE_SIZE:
+                    self._preview_cache.popitem(last=False)
+                print(f"Captured day preview for {target_date.strftime('%Y-%m-%d')} ({len(image)} bytes)")
+                return image
+            except Exception as e:
+                print(f"Error capturing preview (attempt {attempt + 1}): {e}")
+                if attempt == 0:
+                    await self._recover()
+        
+        self.preview_failures += 1
+        return None
+    
+    @asynccontextmanager
+    async def _preview_page(self):
+        """
+        A page to screenshot on. Pool pages abort images and fonts when resource blocking is on,
+        so previews then use a separate context (same session, nothing routed) one at a time.
+        """
+        if not (self.resources.enabled and self._worker_headless):
+            async with self.pages.lease(Priority.READ) as page:
+                yield page
+            return
+        
+        async with self._preview_lock:
+            if self.preview_context is None:
+                self.preview_context = await self.browser.new_context(
+                    storage_state=await self.context.storage_state(),
+                    viewport={'width': 1280, 'height': 800}
                 )
-                
-                await self.page.goto(create_url, wait_until='domcontentloaded', timeout=15000)
-                await asyncio.sleep(2)
-                
-                save_selectors = [
-                    'button:has-text("Save")',
-                    'button:has-text("儲存")',
-                    'button:has-text("保存")',
-                    '[aria-label="Save"]',
-                    '[aria-label="儲存"]',
-                    '[aria-label="保存"]',
-                    '[data-mdc-dialog-action="save"]',
-                ]
-                
-                save_button = None
-                for selector in save_selectors:
-                    try:
-                        save_button = await self.page.wait_for_selector(selector, timeout=2000)
-                        if save_button:
-                            break
-                    except:
-                        continue
-                
+                await self.resources.attach(self.preview_context, block=False)
+            page = await self.preview_context.new_page()
+            try:
+                yield page
+            finally:
+                await page.close()
+    
+    def preview_stats(self) -> dict:
+        return {
+            "cached_days": len(self._preview_cache),
+            "ttl_seconds": self.event_cache_ttl,
+            "hits": self.preview_hits,
+            "captures": self.preview_captures,
+            "failures": self.preview_failures,
+        }
+
+    async def create_event(
+        self,
+        title: str,
+        start_time: datetime,
+        end_time: datetime,
+        show: bool = None
+    ) -> tuple[Optional[bool], Optional[str]]:
+        """
+        Create an event through the editor and wait for Google's save response.
+        Returns (created, event_id); created is None when Save was clicked but neither the
+        response nor a re-scrape could confirm the outcome. event_id is None when the
+        response didn't carry one.
+        show (default: show_after_create) opens the viewer on the event's date in the
+        background, so it never adds to the caller's latency.
+        """
+        show = self.show_after_create if show is None else show
+        if not self._is_logged_in:
+            return False, None
+        
+        created, event_id = False, None  # created is None when the save outcome is unknown
+        for attempt in range(2):
+            try:
+                await self._ensure_browser()
+                # Bookings jump the queue ahead of reads and background syncs
+                async with self.pages.lease(Priority.WRITE) as page:
+                    created, event_id = await self._save_event(page, title, start_time, end_time)
+                break
+            except Exception as e:
+                # _save_event only raises before Save is clicked, so retrying can't double-book
+                print(f"Error creating event (attempt {attempt + 1}): {e}")
+                if attempt == 0:
+                    await self._recover()
+                else:
+                    if show:
+                        self._show_in_background(start_time)
+                    return False, None
+        
+        if created is None:
+            # Save clicked but never confirmed. Reporting failure would invite a duplicate
+            # retry, so re-read the day and look for the event instead.
+            self.invalidate_events(start_time)
+            self.invalidate_events(end_time)
+            created = await self._verify_created(title, start_time)
+        
+        if not created:
+            if created is None and show:
+                self._show_in_background(start_time)
+            return created, None
+        
+        if event_id:
+            self._cache_created_event(CalendarEvent(event_id, title, start_time, end_time))
+        else:
+            # Can't place it precisely, so cached scrapes of these days are stale
+            self.invalidate_events(start_time)
+            self.invalidate_events(end_time)
+        
+        if show:
+            self._show_in_background(start_time)
+        return True, event_id
+    
+    def _show_in_background(self, target_date: datetime):
+        task = asyncio.create_task(self.show_calendar_date(target_date))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+    
+    async def _verify_created(self, title: str, start_time: datetime) -> Optional[bool]:
+        """
+        Re-scrape the day of an unconfirmed save and check whether the event is there.
+        None if the day couldn't be read.
+        """
+        events = await self.refresh_events_for_date(start_time, priority=Priority.WRITE)
+        if events is None:
+            print(f"Could not verify save of '{title}'")
+            return None
+        wanted = title.casefold()
+        found = any(
+            event.start == start_time and wanted in (event.label or event.title).casefold()
+            for event in events
+        )
+        print(f"Unconfirmed save of '{title}' {'found' if found else 'not found'} on re-scrape")
+        return found
+    
+    async def _save_event(
+        self,
+        page: Page,
+        title: str,
+        start_time: datetime,
+        end_time: datetime
+    ) -> tuple[Optional[bool], Optional[str]]:
+        """
+        Fill the editor on a leased page and save. Returns (confirmed, event_id);
+        confirmed is None when the outcome is unknown: no save response was seen and the
+        editor didn't close, or something failed after the click. Raises only for failures
+        before Save was clicked, which are safe to retry.
+        """
+        start_str = start_time.strftime("%Y%m%dT%H%M%S")
+        end_str = end_time.strftime("%Y%m%dT%H%M%S")
+        encoded_title = urllib.parse.quote(title)
+        
+        create_url = (
+            f"https://calendar.google.com/calendar/render"
+            f"?action=TEMPLATE"
+            f"&text={encoded_title}"
+            f"&dates={start_str}/{end_str}"
+        )
+        
+        await self._goto(create_url, page=page, wait_until='domcontentloaded', timeout=15000)
+        
+        save_selectors = [
+            'button:has-text("Save")',
+            'button:has-text("儲存")',
+            'button:has-text("保存")',
+            '[aria-label="Save"]',
+            '[aria-label="儲存"]',
+            '[aria-label="保存"]',
+            '[data-mdc-dialog-action="save"]',
+        ]
+        
+        # One combined selector: resolves as soon as any variant of the editor's Save button shows
+        save_button = await self.readiness.wait_for_selector(
+            page, 'editor', ', '.join(save_selectors), timeout=5000
+        )
+        
+        # Google's own save request is the confirmation: return as soon as it answers
+        event_id = None
+        clicked = False
+        started = time.perf_counter()
+        try:
+            async with page.expect_response(
+                lambda response: self._is_save_response(response, title), timeout=self.SAVE_CONFIRM_TIMEOUT
+            ) as response_info:
+                # From here on the event may exist, whatever happens next
+                clicked = True
                 if save_button:
                     await save_button.click()
-                    await asyncio.sleep(2)
-                    print(f"Event '{title}' created")
                 else:
                     print("Save button not found, trying Ctrl+S")
-                    await self.page.keyboard.press('Control+s')
-                    await asyncio.sleep(2)
-                
+                    await page.keyboard.press('Control+s')
+            response = await response_info.value
+            confirmed = response.ok
+            if confirmed:
                 try:
-                    await self._switch_to_visible()
-                    await self.navigate_to_date(start_time)
-                except:
-                    pass
-                
-                return True
-                
-            except Exception as e:
-                print(f"Error creating event (attempt {attempt + 1}): {e}")
-                if attempt == 0:
-                    await self._reconnect(headless=self._is_headless)
-                else:
-                    try:
-                        await self._switch_to_visible()
-                    except:
-                        pass
-                    return False
+                    event_id = self._parse_saved_event_id(await response.text(), title, start_time)
+                except Exception as e:
+                    print(f"Save confirmed but its response body was unreadable: {e}")
+            else:
+                print(f"Save rejected: HTTP {response.status}")
+        except PlaywrightTimeoutError:
+            # No save response seen; fall back to the editor closing as a weaker signal
+            print("Save response not observed, checking editor state")
+            try:
+                closed = await self.readiness.wait_for_url(
+                    page, 'save', lambda url: 'action=TEMPLATE' not in url, timeout=2000
+                )
+            except Exception:
+                closed = False
+            confirmed = True if closed else None
+        except Exception as e:
+            if not clicked:
+                raise
+            # e.g. the page closed mid-save: retrying could book the event twice
+            print(f"Error after Save was clicked, outcome unknown: {e}")
+            confirmed = None
+        self._record_save(time.perf_counter() - started, confirmed, event_id)
         
-        return False
+        if confirmed:
+            print(f"Event '{title}' created (id={event_id})")
+        return confirmed, event_id
+    
+    def _is_save_response(self, response: Response, title: str) -> bool:
+        """
+        Matches the save request for this event only: a POST to a save path on
+        calendar.google.com whose body carries the event's title. Background polling,
+        prefetch and logging POSTs don't.
+        """
+        request = response.request
+        if request.method != 'POST':
+            return False
+        parts = urllib.parse.urlsplit(response.url)
+        if parts.hostname != 'calendar.google.com' or not parts.path.endswith(self.SAVE_PATHS):
+            return False
+        try:
+            post_data = request.post_data or ''
+        except Exception:
+            return False  # Binary body
+        return self._mentions_title(post_data, title) or self._mentions_title(urllib.parse.unquote_plus(post_data), title)
+    
+    @classmethod
+    def _parse_saved_event_id(cls, body: str, title: str, start_time: datetime) -> Optional[str]:
+        """
+        The new event's id from the save response, accepted only if the response is
+        clearly about this event (it carries the title and start time) and names
+        exactly one event id.
+        """
+        body = body or ''
+        if not cls._mentions_title(body, title) or not cls._mentions_start(body, start_time):
+            return None
+        ids = set(cls._SAVED_EVENT_ID.findall(body))
+        return ids.pop() if len(ids) == 1 else None
+    
+    @staticmethod
+    def _mentions_title(text: str, title: str) -> bool:
+        # Raw, or escaped the way JSON encoding would write it
+        return title in text or json.dumps(title)[1:-1] in text
+    
+    @staticmethod
+    def _mentions_start(text: str, start_time: datetime) -> bool:
+        forms = (
+            str(int(start_time.timestamp() * 1000)),
+            str(int(start_time.timestamp())),
+            start_time.strftime("%Y-%m-%dT%H:%M"),
+            start_time.strftime("%Y%m%dT%H%M%S"),
+        )
+        return any(form in text for form in forms)
+    
+    def _cache_created_event(self, event: CalendarEvent):
+        """Add a confirmed event to the cached days it spans; uncached days are left for the next scrape."""
+        for day in self._days_between(event.start, event.end):
+            self._drop_preview(day)
+            cached = self._event_cache.get(day)
+            if cached and time.monotonic() < cached[1]:
+                # Only ever added: the save response's id format differs from scraped DOM ids,
+                # so it can't be used to decide which cached events to drop
+                self._event_cache[day] = (cached[0] + [event], cached[1])
+    
+    def _record_save(self, seconds: float, confirmed: bool, event_id: Optional[str]):
+        ms = seconds * 1000
+        self.saves += 1
+        self.saves_confirmed += bool(confirmed)
+        self.saves_with_id += event_id is not None
+        self.save_ms_total += ms
+        self.save_ms_last = ms
+    
+    def save_stats(self) -> dict:
+        return {
+            "saves": self.saves,
+            "confirmed": self.saves_confirmed,
+            "with_event_id": self.saves_with_id,
+            "avg_ms": round(self.save_ms_total / self.saves, 1) if self.saves else 0.0,
+            "last_ms": round(self.save_ms_last, 1),
+        }
     
     async def close(self):
+        for task in list(self._background_tasks):
+            task.cancel()
         try:
+            await self._close_viewer()
             if self.page:
                 await self.page.close()
             if self.context:
@@ -277,6 +877,13 @@ class CalendarAutomation:
         return self._is_logged_in
 
     async def _close_context(self):
+        await self.pages.bind(None)
+        if self.preview_context:
+            try:
+                await self.preview_context.close()
+            except Exception:
+                pass
+            self.preview_context = None
         if self.page:
             await self.page.close()
             self.page = None
@@ -285,24 +892,34 @@ class CalendarAutomation:
             self.context = None
     
     async def _ensure_browser(self):
-        need_reconnect = False
-        
-        if self.browser is None or not self.browser.is_connected():
-            need_reconnect = True
-        elif self.page is None:
-            need_reconnect = True
-        else:
-            try:
-                # Test if page is actually usable
-                _ = self.page.url
-            except:
+        # Concurrent jobs can all notice a dead browser; only the first relaunches it
+        async with self._browser_lock:
+            need_reconnect = False
+            
+            if self.browser is None or not self.browser.is_connected():
                 need_reconnect = True
-        
-        if need_reconnect:
-            print("Browser not available, reconnecting...")
-            await self._reconnect(headless=True)
+            elif self.page is None:
+                need_reconnect = True
+            else:
+                try:
+                    # Test if page is actually usable
+                    _ = self.page.url
+                except:
+                    need_reconnect = True
+            
+            if need_reconnect:
+                print("Browser not available, reconnecting...")
+                await self._reconnect()
     
-    async def _reconnect(self, headless: bool = True):
+    async def _recover(self):
+        """
+        After a failed job. Other jobs may still hold pool pages, so the browser is only
+        relaunched if it is actually gone; a closed page is replaced by the pool on release.
+        """
+        await self._ensure_browser()
+    
+    async def _reconnect(self):
+        """(Re)launch the worker browser with the saved session."""
         await self._close_context()
         if self.browser:
             try:
@@ -313,9 +930,8 @@ class CalendarAutomation:
         if self.playwright is None:
             self.playwright = await async_playwright().start()
         
-        self._is_headless = headless
         self.browser = await self.playwright.chromium.launch(
-            headless=headless,
+            headless=self._worker_headless,
             args=['--disable-blink-features=AutomationControlled']
         )
         
@@ -329,27 +945,65 @@ class CalendarAutomation:
                 viewport={'width': 1280, 'height': 800}
             )
         
+        await self.resources.attach(self.context, block=self._worker_headless)
         self.page = await self.context.new_page()
-        await self.page.goto(self.GOOGLE_CALENDAR_URL, wait_until='domcontentloaded', timeout=15000)
-
-    async def _switch_to_visible(self):
-        if not self._is_headless:
-            return
-        print("Switching to visible mode...")
-        await self._reconnect(headless=False)
-        self._is_headless = False
-        await self.page.bring_to_front()
+        await self.pages.bind(self.context)
+        await self._goto(self.GOOGLE_CALENDAR_URL, wait_until='domcontentloaded', timeout=15000)
+    
+    async def _goto(self, url: str, page: Page = None, **kwargs):
+        """page.goto (on the primary page by default), recorded as a navigation for the resource metrics."""
+        page = page or self.page
+        self.resources.begin_navigation(page, url)
+        started = time.perf_counter()
+        try:
+            return await page.goto(url, **kwargs)
+        finally:
+            self.resources.end_navigation(page, time.perf_counter() - started)
 
-    async def _switch_to_headless(self):
-        if self._is_headless:
-            return
-        print("Switching to headless mode...")
-        await self._reconnect(headless=True)
-        self._is_headless = True
+    async def _ensure_viewer(self):
+        """Make sure the viewer window is open, launching it only if it was never opened or got closed."""
+        if self.viewer_browser is None or not self.viewer_browser.is_connected():
+            await self._close_viewer()
+            print("Launching viewer window...")
+            await self._launch_viewer(with_state=True)
+        elif self.viewer_page is None or self.viewer_page.is_closed():
+            # The user closed the tab; a new page in the same context is enough
+            self.viewer_page = await self.viewer_context.new_page()
+    
+    async def _launch_viewer(self, with_state: bool):
+        if self.playwright is None:
+            self.playwright = await async_playwright().start()
+        
+        self.viewer_browser = await self.playwright.chromium.launch(
+            headless=False,
+            args=['--disable-blink-features=AutomationControlled']
+        )
+        if with_state and self._has_saved_state():
+            self.viewer_context = await self.viewer_browser.new_context(
+                storage_state=self.STORAGE_STATE_PATH,
+                viewport={'width': 1280, 'height': 800}
+            )
+        else:
+            self.viewer_context = await self.viewer_browser.new_context(
+                viewport={'width': 1280, 'height': 800}
+            )
+        # Measured but never blocked: the viewer should look normal
+        await self.resources.attach(self.viewer_context, block=False)
+        self.viewer_page = await self.viewer_context.new_page()
+    
+    async def _close_viewer(self):
+        browser, self.viewer_browser = self.viewer_browser, None
+        self.viewer_context = None
+        self.viewer_page = None
+        if browser:
+            try:
+                await browser.close()
+            except:
+                pass
 
-    async def _save_login_state(self):
+    async def _save_login_state(self, context: BrowserContext):
         try:
-            await self.context.storage_state(path=self.STORAGE_STATE_PATH)
+            await context.storage_state(path=self.STORAGE_STATE_PATH)
             print(f"Login state saved to {self.STORAGE_STATE_PATH}")
         except Exception as e:
             print(f"Error saving login state: {e}")
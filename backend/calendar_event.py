@@ -0,0 +1,233 @@
+"""
+Calendar Event - compact record for events scraped from the Google Calendar DOM.
+"""
+import re
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+
+# "10am to 11:30am, Team Standup, ..." / "14:00 – 15:00, ..."
+_EN_TIME = r'\d{1,2}(?::\d{2})?\s*(?:[ap]\.?\s?m\.?)?'
+_EN_RANGE = re.compile(
+    rf'^\s*(?P<start>{_EN_TIME})\s*(?:to|–|—|-)\s*(?P<end>{_EN_TIME})\s*,\s*(?P<rest>.*)$',
+    re.IGNORECASE
+)
+_EN_TOKEN = re.compile(r'^(?P<hour>\d{1,2})(?::(?P<minute>\d{2}))?\s*(?P<meridiem>[ap])?', re.IGNORECASE)
+
+# "下午2點至下午3點，會議，..." / "上午10:00 到 11:30，..."
+_ZH_TIME = (
+    r'(?:上午|下午|中午|晚上|凌晨|早上)?\s*\d{1,2}'
+    r'(?:[:：]\d{2}|\s*[点點时時](?:\s*\d{1,2}\s*分|\s*半)?)'
+)
+_ZH_RANGE = re.compile(
+    rf'^\s*(?P<start>{_ZH_TIME})\s*(?:至|到|-|–|—|~)\s*(?P<end>{_ZH_TIME})\s*[，,、]\s*(?P<rest>.*)$'
+)
+_ZH_TOKEN = re.compile(
+    r'^(?P<period>上午|下午|中午|晚上|凌晨|早上)?\s*(?P<hour>\d{1,2})'
+    r'(?:[:：](?P<minute>\d{2})|\s*[点點时時](?:\s*(?P<minute2>\d{1,2})\s*分|\s*(?P<half>半))?)'
+)
+
+_ALL_DAY = re.compile(r'^\s*(?:all[\s-]day|全天|整天)', re.IGNORECASE)
+_ZH_PM = {'下午', '晚上'}
+_ZH_AM = {'上午', '凌晨', '早上'}
+
+
+def _en_time(token: str, default_meridiem: str = None) -> tuple[int, int, Optional[str]]:
+    match = _EN_TOKEN.match(token.strip())
+    hour, minute = int(match.group('hour')), int(match.group('minute') or 0)
+    meridiem = (match.group('meridiem') or default_meridiem or '').lower() or None
+    if meridiem == 'p' and hour < 12:
+        hour += 12
+    elif meridiem == 'a' and hour == 12:
+        hour = 0
+    return hour, minute, meridiem
+
+
+def _zh_time(token: str, default_period: str = None) -> tuple[int, int, Optional[str]]:
+    match = _ZH_TOKEN.match(token.strip())
+    hour = int(match.group('hour'))
+    minute = int(match.group('minute') or match.group('minute2') or (30 if match.group('half') else 0))
+    period = match.group('period') or default_period
+    if period in _ZH_PM and hour < 12:
+        hour += 12
+    elif period == '中午' and hour < 11:
+        hour += 12
+    elif period in _ZH_AM and hour == 12:
+        hour = 0
+    return hour, minute, period
+
+
+# "December 2, 2025" / "2025年12月2日"
+_EN_DATE = re.compile(
+    r'\b(?P<month>January|February|March|April|May|June|July|August|September|October|November|December)'
+    r'\s+(?P<day>\d{1,2}),?\s+(?P<year>\d{4})\b',
+    re.IGNORECASE
+)
+_ZH_DATE = re.compile(r'(?P<year>\d{4})\s*年\s*(?P<month>\d{1,2})\s*月\s*(?P<day>\d{1,2})\s*日')
+_MONTHS = {name: i for i, name in enumerate(
+    ['january', 'february', 'march', 'april', 'may', 'june', 'july',
+     'august', 'september', 'october', 'november', 'december'], start=1
+)}
+
+# "Calendar: Work" / "日曆：工作" / "日历：工作"
+_CALENDAR = re.compile(r'(?:Calendar|日曆|日历)\s*[:：]\s*(?P<name>[^,，]+)', re.IGNORECASE)
+
+
+def parse_label_date(label: str) -> Optional[date]:
+    """The (first) calendar date mentioned in an event label, as shown in week view."""
+    match = _EN_DATE.search(label)
+    if match:
+        month = _MONTHS[match.group('month').lower()]
+    else:
+        match = _ZH_DATE.search(label)
+        if not match:
+            return None
+        month = int(match.group('month'))
+    try:
+        return date(int(match.group('year')), month, int(match.group('day')))
+    except ValueError:
+        return None
+
+
+_EN_MONTH_DAY = re.compile(
+    r'\b(?P<month>January|February|March|April|May|June|July|August|September|October|November|December)'
+    r'\s+(?P<day>\d{1,2})\b',
+    re.IGNORECASE
+)
+_ZH_MONTH_DAY = re.compile(r'(?P<month>\d{1,2})\s*月\s*(?P<day>\d{1,2})\s*日')
+
+
+def parse_header_date(label: str, near: date) -> Optional[date]:
+    """
+    The date in a week-view column header. Headers often omit the year, so it is
+    taken from whichever year puts the date within a week of near.
+    """
+    full = parse_label_date(label)
+    if full is not None:
+        return full
+    match = _EN_MONTH_DAY.search(label)
+    if match:
+        month = _MONTHS[match.group('month').lower()]
+    else:
+        match = _ZH_MONTH_DAY.search(label)
+        if not match:
+            return None
+        month = int(match.group('month'))
+    for year in (near.year, near.year - 1, near.year + 1):
+        try:
+            candidate = date(year, month, int(match.group('day')))
+        except ValueError:
+            continue
+        if abs((candidate - near).days) <= 7:
+            return candidate
+    return None
+
+
+def parse_time_range(label: str, date: datetime) -> Optional[tuple[str, datetime, datetime]]:
+    """
+    Parse the leading time range of an event label into (title, start, end) on date.
+    Returns None if the label is not understood.
+    """
+    match = _EN_RANGE.match(label)
+    if match:
+        # "10 to 11am": the start inherits the end's meridiem, unless that puts it after the end ("11 to 1pm")
+        end_h, end_m, meridiem = _en_time(match.group('end'))
+        start_h, start_m, _ = _en_time(match.group('start'), meridiem)
+        if (start_h, start_m) > (end_h, end_m):
+            start_h, start_m, _ = _en_time(match.group('start'))
+    else:
+        match = _ZH_RANGE.match(label)
+        if not match:
+            return None
+        # "上午11點至1點": the end inherits the start's period, then flips half-day if it lands before the start
+        start_h, start_m, period = _zh_time(match.group('start'))
+        end_h, end_m, _ = _zh_time(match.group('end'), period)
+        inherited = _ZH_TOKEN.match(match.group('end').strip()).group('period') is None
+        if inherited and (end_h, end_m) <= (start_h, start_m):
+            end_h = end_h + 12 if end_h < 12 else end_h - 12
+
+    if start_h > 23 or end_h > 23 or start_m > 59 or end_m > 59:
+        return None
+
+    day = date.replace(hour=0, minute=0, second=0, microsecond=0)
+    start = day.replace(hour=start_h, minute=start_m)
+    end = day.replace(hour=end_h, minute=end_m)
+    if end <= start:
+        end += timedelta(days=1)  # Runs past midnight
+
+    title = re.split(r'[,，、]', match.group('rest'), maxsplit=1)[0].strip()
+    return title, start, end
+
+
+class CalendarEvent:
+    """
+    One calendar event. start/end are None when the label could not be parsed
+    (and the event is not all-day); the raw label is kept for LLM fallback.
+    """
+
+    __slots__ = ('id', 'title', 'start', 'end', 'all_day', 'calendar', 'label')
+
+    def __init__(
+        self,
+        id: Optional[str],
+        title: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        all_day: bool = False,
+        calendar: Optional[str] = None,
+        label: str = ""
+    ):
+        self.id = id
+        self.title = title
+        self.start = start
+        self.end = end
+        self.all_day = all_day
+        self.calendar = calendar
+        self.label = label
+
+    @classmethod
+    def from_label(cls, label: str, date: datetime, event_id: str = None) -> 'CalendarEvent':
+        """Build an event from a DOM aria-label (or inner text) on the given date."""
+        label = label.strip()
+        calendar_match = _CALENDAR.search(label)
+        calendar = calendar_match.group('name').strip() if calendar_match else None
+
+        all_day = _ALL_DAY.match(label)
+        if all_day:
+            rest = label[all_day.end():].lstrip(' ,，、')
+            title = re.split(r'[,，、]', rest, maxsplit=1)[0].strip()
+            return cls(event_id, title, all_day=True, calendar=calendar, label=label)
+
+        parsed = parse_time_range(label, date)
+        if parsed is None:
+            return cls(event_id, label, calendar=calendar, label=label)
+
+        title, start, end = parsed
+        return cls(event_id, title, start, end, calendar=calendar, label=label)
+
+    @property
+    def is_timed(self) -> bool:
+        return self.start is not None and self.end is not None
+
+    def overlaps(self, start: datetime, end: datetime) -> bool:
+        """Back-to-back is fine: conflict only if the intervals strictly overlap."""
+        return self.is_timed and start < self.end and end > self.start
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "title": self.title,
+            "start": self.start.isoformat() if self.start else None,
+            "end": self.end.isoformat() if self.end else None,
+            "all_day": self.all_day,
+            "calendar": self.calendar,
+        }
+
+    def __repr__(self) -> str:
+        if self.all_day:
+            when = "all day"
+        elif self.is_timed:
+            when = f"{self.start:%H:%M}-{self.end:%H:%M}"
+        else:
+            when = "unparsed"
+        return f"CalendarEvent({self.title!r}, {when}, id={self.id!r})"
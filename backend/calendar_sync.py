@@ -0,0 +1,106 @@
+"""
+Calendar Sync - background worker that keeps a rolling window of days warm
+in CalendarAutomation's event cache, so request handlers read availability from memory.
+"""
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+
+from calendar_automation import CalendarAutomation
+from page_pool import Priority
+
+
+class CalendarSyncWorker:
+    """Periodically re-scrapes today through +window_days; days can also be queued for an early refresh."""
+
+    WINDOW_DAYS = 14
+    INTERVAL = 5 * 60  # seconds between full window refreshes
+
+    def __init__(self, calendar: CalendarAutomation, window_days: int = None, interval: int = None):
+        self.calendar = calendar
+        self.window_days = window_days or int(os.getenv("SYNC_WINDOW_DAYS", self.WINDOW_DAYS))
+        self.interval = interval or int(os.getenv("SYNC_INTERVAL", self.INTERVAL))
+        self._pending: set = set()
+        self._wakeup = asyncio.Event()
+
+        self.syncs = 0
+        self.days_refreshed = 0
+        self.failures = 0
+        self.last_sync_seconds = None
+        self.last_sync_at = None
+
+    @property
+    def cache_ttl(self) -> float:
+        # Never fresher than one pass: edits made elsewhere must show up by the next sync.
+        # Bookings read these days; one that has expired is re-scraped on the request path.
+        return self.interval
+
+    def request_refresh(self, target_date: datetime):
+        """Ask the worker to re-scrape a date soon (e.g. after an event was created)."""
+        self._pending.add(target_date.replace(hour=0, minute=0, second=0, microsecond=0))
+        self._wakeup.set()
+
+    def window(self) -> list[datetime]:
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        return [today + timedelta(days=i) for i in range(self.window_days + 1)]
+
+    async def run(self):
+        """Background loop: refresh the whole window every interval, pending days as soon as queued."""
+        next_full_sync = 0.0
+        while True:
+            try:
+                if self.calendar.is_logged_in:
+                    if time.monotonic() >= next_full_sync:
+                        await self.sync_window()
+                        next_full_sync = time.monotonic() + self.interval
+                    else:
+                        await self._sync_pending()
+            except Exception as e:
+                print(f"Calendar sync error: {e}")
+
+            try:
+                timeout = max(0.0, next_full_sync - time.monotonic()) or self.interval
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def sync_window(self):
+        started = time.monotonic()
+        self._pending.clear()
+        window = self.window()
+        # Week-view scraping: one browser navigation per week instead of per day
+        refreshed = await self.calendar.refresh_events_for_range(
+            window[0], window[-1], ttl=self.cache_ttl, priority=Priority.BACKGROUND
+        )
+        self.days_refreshed += len(refreshed)
+        self.failures += len(window) - len(refreshed)
+
+        self.syncs += 1
+        self.last_sync_seconds = round(time.monotonic() - started, 2)
+        self.last_sync_at = datetime.now().isoformat(timespec='seconds')
+        print(f"Calendar sync refreshed {self.window_days + 1} days in {self.last_sync_seconds}s")
+
+    async def _sync_pending(self):
+        while self._pending:
+            await self._refresh(self._pending.pop())
+
+    async def _refresh(self, day: datetime):
+        events = await self.calendar.refresh_events_for_date(day, ttl=self.cache_ttl, priority=Priority.BACKGROUND)
+        if events is None:
+            self.failures += 1
+        else:
+            self.days_refreshed += 1
+
+    def stats(self) -> dict:
+        return {
+            "window_days": self.window_days,
+            "interval_seconds": self.interval,
+            "syncs": self.syncs,
+            "days_refreshed": self.days_refreshed,
+            "failures": self.failures,
+            "pending": len(self._pending),
+            "last_sync_seconds": self.last_sync_seconds,
+            "last_sync_at": self.last_sync_at,
+        }
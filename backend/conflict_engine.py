@@ -0,0 +1,69 @@
+"""
+Conflict Engine - local interval-overlap checks on scraped calendar events.
+Falls back to the LLM only for events whose labels could not be parsed.
+"""
+from datetime import datetime
+from typing import Optional
+
+from ai_service import AIService
+from calendar_event import CalendarEvent
+
+
+class ConflictEngine:
+    """Deterministic conflict checker over CalendarEvent intervals."""
+
+    def __init__(self, ai_service: AIService):
+        self.ai_service = ai_service
+        self.checks = 0
+        self.local_decisions = 0
+        self.llm_fallbacks = 0
+        self.labels_parsed = 0
+        self.labels_unparsed = 0
+
+    async def check_conflict(
+        self,
+        events: list[CalendarEvent],
+        proposed_start: datetime,
+        proposed_end: datetime
+    ) -> tuple[bool, Optional[str]]:
+        """
+        Same result as AIService.check_conflict: (is_available, conflicting_event_title).
+        Timed events are checked locally; only unparsed labels are sent to the LLM.
+        """
+        self.checks += 1
+        unparsed = []
+
+        for event in events:
+            if event.all_day:
+                self.labels_parsed += 1
+                continue  # All-day events don't block a time slot
+            if not event.is_timed:
+                unparsed.append(event.label)
+                continue
+
+            self.labels_parsed += 1
+            if event.overlaps(proposed_start, proposed_end):
+                self.local_decisions += 1
+                print(f"Local conflict with {event}")
+                return False, event.title or "an existing event"
+
+        self.labels_unparsed += len(unparsed)
+        if not unparsed:
+            self.local_decisions += 1
+            return True, None
+
+        self.llm_fallbacks += 1
+        print(f"Falling back to LLM for {len(unparsed)} unparsed labels")
+        return await self.ai_service.check_conflict(unparsed, proposed_start, proposed_end)
+
+    def stats(self) -> dict:
+        labels = self.labels_parsed + self.labels_unparsed
+        return {
+            "checks": self.checks,
+            "local_decisions": self.local_decisions,
+            "llm_fallbacks": self.llm_fallbacks,
+            "fallback_rate": round(self.llm_fallbacks / self.checks, 3) if self.checks else 0.0,
+            "labels_parsed": self.labels_parsed,
+            "labels_unparsed": self.labels_unparsed,
+            "label_parse_rate": round(self.labels_parsed / labels, 3) if labels else 0.0,
+        }
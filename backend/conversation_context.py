@@ -1,13 +1,25 @@
 """
 Conversation context for multi-turn scheduling.
 """
+import time
+import uuid
+import asyncio
+from collections import OrderedDict
 from datetime import datetime
 from typing import Optional
 
 
+SUPPORTED_LANGUAGES = ['en', 'zh-CN', 'zh-TW', 'yue']
+DEFAULT_LANGUAGE = 'en'
+
+
 class ConversationContext:
     
     def __init__(self):
+        # Serializes turns within one session; different sessions never contend
+        self.lock = asyncio.Lock()
+        # None until the session's language has been detected
+        self.language: Optional[str] = None
         self.clear()
     
     def clear(self):
@@ -31,6 +43,14 @@ class ConversationContext:
             }
         return None
     
+    def set_language(self, lang: str):
+        if lang in SUPPORTED_LANGUAGES:
+            self.language = lang
+    
+    @property
+    def reply_language(self) -> str:
+        return self.language or DEFAULT_LANGUAGE
+    
     def clear_for_reschedule(self):
         self.start_time = None
         self.end_time = None
@@ -50,8 +70,63 @@ class ConversationContext:
         return f"Pending event: {', '.join(parts)}."
 
 
-_context = ConversationContext()
+class ConversationStore:
+    """Session-keyed contexts with idle TTL and LRU eviction past max_sessions."""
+    
+    TTL_SECONDS = 30 * 60
+    MAX_SESSIONS = 1000
+    
+    def __init__(self, ttl_seconds: int = None, max_sessions: int = None):
+        self.ttl_seconds = ttl_seconds or self.TTL_SECONDS
+        self.max_sessions = max_sessions or self.MAX_SESSIONS
+        self._sessions: OrderedDict[str, tuple[ConversationContext, float]] = OrderedDict()
+        self.evictions = 0
+    
+    def get(self, session_id: str) -> ConversationContext:
+        """Return the session's context, creating it if needed."""
+        now = time.monotonic()
+        self._evict_expired(now)
+        
+        entry = self._sessions.pop(session_id, None)
+        context = entry[0] if entry else ConversationContext()
+        self._sessions[session_id] = (context, now)
+        
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evictions += 1
+        return context
+    
+    def discard(self, session_id: str):
+        self._sessions.pop(session_id, None)
+    
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "ttl_seconds": self.ttl_seconds,
+            "evictions": self.evictions,
+        }
+    
+    def _evict_expired(self, now: float):
+        # Oldest-used sessions are at the front, so stop at the first live one
+        while self._sessions:
+            session_id, (_, last_used) = next(iter(self._sessions.items()))
+            if now - last_used <= self.ttl_seconds:
+                break
+            del self._sessions[session_id]
+            self.evictions += 1
+
+
+_store = ConversationStore()
+
+
+def new_session_id() -> str:
+    return uuid.uuid4().hex
+
+
+def get_context(session_id: str) -> ConversationContext:
+    return _store.get(session_id)
 
 
-def get_context() -> ConversationContext:
-    return _context
\ No newline at end of file
+def get_context_store() -> ConversationStore:
+    return _store
\ No newline at end of file
@@ -3,25 +3,43 @@ Calendar Assistance - FastAPI main
 """
 import os
 import json
-from fastapi import FastAPI, UploadFile, File
+import asyncio
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request, Depends
+from fastapi.responses import Response, FileResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
+from datetime import datetime
 from contextlib import asynccontextmanager
 
 from voice_handler import VoiceHandler
+from audio_store import MemoryAudioStore
 from ai_service import AIService, ScheduleParseError, get_ai_service
 from calendar_automation import CalendarAutomation, get_calendar_automation
-from conversation_context import get_context
+from conflict_engine import ConflictEngine
+from calendar_sync import CalendarSyncWorker
+from page_pool import Priority
+from conversation_context import get_context, get_context_store, new_session_id
 
 # Global instances
 voice_handler: VoiceHandler = None
 ai_service: AIService = None
 calendar_automation: CalendarAutomation = None
+conflict_engine: ConflictEngine = None
+calendar_sync: CalendarSyncWorker = None
 
 # Constants
 STATIC_FOLDER = "static/audio"
+# Audio delivery modes, read from the environment once .env is loaded (see _load_audio_modes)
+AUDIO_IN_MEMORY = False
+AUDIO_STREAMING = False
+AUDIO_DEFERRED = False
+AUDIO_TICKET_MAX_WAIT = 20  # seconds a long-poll may hold the connection
+SESSION_COOKIE = "session_id"
+SESSION_HEADER = "X-Session-Id"
 GREETING = "Hello, I am your scheduling assistance. How may I help you?"
+MESSAGES_FILE = Path(__file__).parent / "messages.json"
+MESSAGES_POLL_INTERVAL = 5  # seconds between messages.json change checks
 MESSAGES: dict = None
 
 
@@ -29,14 +47,19 @@ os.makedirs(STATIC_FOLDER, exist_ok=True)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global voice_handler, ai_service, calendar_automation
+    global voice_handler, ai_service, calendar_automation, conflict_engine, calendar_sync
     print("Voice Calendar Assistant initiating...")
     
     _load_env()
+    _load_audio_modes()
     _load_messages()
 
-    voice_handler = VoiceHandler(output_dir=STATIC_FOLDER)
+    voice_handler = VoiceHandler(
+        output_dir=STATIC_FOLDER,
+        memory_store=MemoryAudioStore() if AUDIO_IN_MEMORY else None
+    )
     ai_service = get_ai_service()
+    conflict_engine = ConflictEngine(ai_service)
     calendar_automation = get_calendar_automation()
 
     logged_in = await calendar_automation.initialize(headless=True)
@@ -45,16 +68,26 @@ async def lifespan(app: FastAPI):
     else:
         print("Please login to Google Calendar when prompted")
 
-    greeting_file_name: str = "greeting.mp3"
-    greeting_path = STATIC_FOLDER + '/' + greeting_file_name
-    if not os.path.exists(greeting_path):
-        voice_handler.text_to_speech(GREETING, filename=greeting_file_name)
+    await _warm_static_audio()
+    messages_watcher = asyncio.create_task(_watch_messages())
+    audio_gc = asyncio.create_task(voice_handler.audio_store.run_gc())
+    calendar_sync = CalendarSyncWorker(calendar_automation)
+    sync_worker = asyncio.create_task(calendar_sync.run())
     
     yield
 
     print("Voice Calendar Assistant shutting down...")
+    messages_watcher.cancel()
+    audio_gc.cancel()
+    sync_worker.cancel()
+    # Let a reload that's mid warm-up unwind before the voice handler closes under it
+    await asyncio.gather(messages_watcher, audio_gc, sync_worker, return_exceptions=True)
     if calendar_automation:
         await calendar_automation.close()
+    if ai_service:
+        await ai_service.close()
+    if voice_handler:
+        await voice_handler.close()
 
 
 app = FastAPI(
@@ -71,57 +104,149 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.get("/audio/ticket/{ticket}")
+async def resolve_audio_ticket(ticket: str, timeout: float = 10):
+    """Long-poll for deferred audio. Returns ready=false if synthesis is still running after timeout."""
+    try:
+        ready, audio_url = await voice_handler.wait_for_speech(
+            ticket, timeout=max(0, min(timeout, AUDIO_TICKET_MAX_WAIT))
+        )
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Audio ticket not found")
+    return {"ready": ready, "audio_url": audio_url}
+
+
+@app.get("/audio/stream/{stream_id}")
+async def stream_audio(stream_id: str):
+    """Stream MP3 bytes as gTTS produces each sentence chunk."""
+    chunks = voice_handler.stream_speech(stream_id)
+    if chunks is None:
+        raise HTTPException(status_code=404, detail="Audio stream not found")
+    return StreamingResponse(chunks, media_type="audio/mpeg")
+
+
+@app.get("/audio/{audio_id}")
+async def get_audio(audio_id: str):
+    """Serve RAM-backed reply audio. Declared before the static mount so it takes precedence."""
+    memory_store = voice_handler.memory_store if voice_handler else None
+    data = memory_store.get(audio_id) if memory_store else None
+    if data is not None:
+        return Response(content=data, media_type="audio/mpeg")
+    
+    # Unsharded files written directly into the static folder
+    path = Path(STATIC_FOLDER) / audio_id
+    if path.is_file():
+        return FileResponse(path, media_type="audio/mpeg")
+    raise HTTPException(status_code=404, detail="Audio not found")
+
+
 # Serve static
 app.mount("/audio", StaticFiles(directory=STATIC_FOLDER), name="audio")
 
 
+@app.get("/calendar/preview")
+async def calendar_preview(date: str):
+    """PNG of a day view (date=YYYY-MM-DD), captured headlessly and cached until that day changes."""
+    try:
+        target_date = datetime.strptime(date, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="date must be YYYY-MM-DD")
+    
+    if not calendar_automation or not calendar_automation.is_logged_in:
+        raise HTTPException(status_code=503, detail="Calendar not connected")
+    
+    image = await calendar_automation.get_day_preview(target_date)
+    if image is None:
+        raise HTTPException(status_code=502, detail="Could not capture calendar preview")
+    return Response(content=image, media_type="image/png", headers={"Cache-Control": "no-cache"})
+
+
 @app.get("/health")
 async def health_check():
+    memory_store = voice_handler.memory_store if voice_handler else None
     return {
         "status": "healthy",
-        "logged_in": calendar_automation.is_logged_in if calendar_automation else False
+        "logged_in": calendar_automation.is_logged_in if calendar_automation else False,
+        "tts_cache": voice_handler.tts_cache.stats() if voice_handler else None,
+        "audio_store": voice_handler.audio_store.stats() if voice_handler else None,
+        "memory_audio_store": memory_store.stats() if memory_store else None,
+        "sessions": get_context_store().stats(),
+        "conflict_engine": conflict_engine.stats() if conflict_engine else None,
+        "event_cache": calendar_automation.event_cache_stats() if calendar_automation else None,
+        "scrape": calendar_automation.scrape_stats() if calendar_automation else None,
+        "readiness": calendar_automation.readiness.stats() if calendar_automation else None,
+        "saves": calendar_automation.save_stats() if calendar_automation else None,
+        "previews": calendar_automation.preview_stats() if calendar_automation else None,
+        "resources": calendar_automation.resources.stats() if calendar_automation else None,
+        "pages": calendar_automation.pages.stats() if calendar_automation else None,
+        "calendar_sync": calendar_sync.stats() if calendar_sync else None
     }
 
 
+def _get_session_id(request: Request, response: Response) -> str:
+    """Session from the X-Session-Id header or cookie; a new one is issued if neither is set."""
+    session_id = request.headers.get(SESSION_HEADER) or request.cookies.get(SESSION_COOKIE)
+    if not session_id or len(session_id) > 64:
+        session_id = new_session_id()
+    response.set_cookie(SESSION_COOKIE, session_id, httponly=True, samesite="lax")
+    return session_id
+
+
 @app.get("/start-conversation")
-async def start_conversation():
-    get_context().clear()
-    voice_handler.set_language('en')
-    return _build_response(GREETING, success=True)
+async def start_conversation(session_id: str = Depends(_get_session_id)):
+    context = get_context(session_id)
+    context.clear()
+    context.language = None
+    return _build_response(GREETING, success=True, lang='en')
 
 
 @app.post("/schedule")
-async def schedule(audio: UploadFile = File(...)):
-    """Transcribe audio and process the schedule request."""
-    
-    context = get_context()
+async def schedule(
+    audio: UploadFile = File(...),
+    session_id: str = Depends(_get_session_id),
+    show_calendar: bool | None = None
+):
+    """
+    Transcribe audio and process the schedule request.
+    show_calendar=true/false overrides SHOW_AFTER_CREATE for this booking.
+    """
     
+    context = get_context(session_id)
+    async with context.lock:
+        return await _handle_turn(audio, context, show_calendar)
+
+
+async def _handle_turn(audio: UploadFile, context, show_calendar: bool | None = None) -> dict:
     # Transcribe
     audio_data = await audio.read()
-    user_text = voice_handler.transcribe(audio_data, audio.filename)
+    user_text, lang = await voice_handler.transcribe(audio_data, audio.filename, language=context.language)
     
     if not user_text:
-        return _build_response(_get_message('not_heard'), success=False)
+        lang = context.reply_language
+        return _build_response(_get_message('not_heard', lang), success=False, lang=lang)
+    context.set_language(lang)
     
     # Parse with context
-    event, error = _parse_schedule(user_text, context)
+    event, error = await _parse_schedule(user_text, context)
+    lang = context.reply_language
     if error:
-        return _build_response(error, success=False, transcript=user_text)
+        return _build_response(error, success=False, transcript=user_text, lang=lang)
     
     # Create event
-    success, message = await _create_calendar_event(event, context)
-    return _build_response(message, success=success, transcript=user_text)
+    success, message, preview_url = await _create_calendar_event(event, context, lang, show_calendar)
+    return _build_response(message, success=success, transcript=user_text, lang=lang, preview_url=preview_url)
 
 
 @app.get("/login-status")
-async def get_login_status():
+async def get_login_status(session_id: str = Depends(_get_session_id)):
     if not calendar_automation.is_logged_in:
-        message = _get_message('login')
+        lang = get_context(session_id).reply_language
+        message = _get_message('login', lang)
         await calendar_automation.start_manual_login()
         return {
             "logged_in": False,
             "message": message,
-            "audio_url": voice_handler.text_to_speech(message)
+            "audio_url": await voice_handler.text_to_speech_async(message, lang=lang)
         }
     
     return {
@@ -155,36 +280,77 @@ def _load_env():
         raise ValueError(f"OPENAI_API_KEY is empty in {env_file}")
 
 
+def _load_audio_modes():
+    global AUDIO_IN_MEMORY, AUDIO_STREAMING, AUDIO_DEFERRED
+    AUDIO_IN_MEMORY = _env_flag("AUDIO_IN_MEMORY")
+    AUDIO_STREAMING = _env_flag("AUDIO_STREAMING")
+    AUDIO_DEFERRED = _env_flag("AUDIO_DEFERRED")
+
+
+def _env_flag(name: str) -> bool:
+    return os.getenv(name, "").lower() in ("1", "true", "yes")
+
+
 def _load_messages():
     global MESSAGES
-    msg_file = Path(__file__).parent / "messages.json"
-    with open(msg_file, 'r', encoding='utf-8') as f:
+    with open(MESSAGES_FILE, 'r', encoding='utf-8') as f:
         MESSAGES = json.load(f)
 
 
-def _get_message(key: str, lang: str = None, **kwargs) -> str:
-    lang = lang or voice_handler.language if voice_handler else 'en'
+def _static_messages() -> list[tuple[str, str]]:
+    """All (text, lang) pairs that need no formatting, plus the greeting."""
+    static = [(GREETING, 'en')]
+    for lang, msgs in MESSAGES.items():
+        static.extend((text, lang) for text in msgs.values() if '{' not in text)
+    return static
+
+
+async def _warm_static_audio():
+    """Pre-render every static message so those responses never wait on gTTS."""
+    static = _static_messages()
+    rendered = await voice_handler.prerender(static)
+    print(f"Pre-rendered {rendered}/{len(static)} static messages")
+
+
+async def _watch_messages():
+    """Reload messages.json and re-warm the TTS cache whenever the file changes."""
+    last_mtime = MESSAGES_FILE.stat().st_mtime
+    while True:
+        await asyncio.sleep(MESSAGES_POLL_INTERVAL)
+        try:
+            mtime = MESSAGES_FILE.stat().st_mtime
+            if mtime == last_mtime:
+                continue
+            last_mtime = mtime
+            print("messages.json changed, reloading...")
+            _load_messages()
+            await _warm_static_audio()
+        except Exception as e:
+            print(f"Error reloading messages: {e}")
+
+
+def _get_message(key: str, lang: str, **kwargs) -> str:
     msgs = MESSAGES.get(lang, MESSAGES['en'])
     return msgs.get(key, MESSAGES['en'][key]).format(**kwargs)
 
 
-def _format_time(dt, lang: str = None) -> str:
-    lang = lang or voice_handler.language if voice_handler else 'en'
+def _format_time(dt, lang: str) -> str:
     if lang in ['zh-CN', 'zh-TW']:
         return dt.strftime('%m月%d日 %H:%M')
     return dt.strftime('%B %d at %I:%M %p')
 
-def _parse_schedule(text: str, context=None) -> tuple[dict | None, str | None]:
+async def _parse_schedule(text: str, context) -> tuple[dict | None, str | None]:
     """
-    Parse schedule from text, optionally using context for multi-turn.
+    Parse schedule from text using the session context for multi-turn.
+    Updates the session language from the parse result.
     Returns (event, None) on success, (None, error_message) on failure.
     """
     try:
-        context_str = context.get_context_for_parser() if context else ""
-        parsed = ai_service.parse_schedule(text, context_str)
+        context_str = context.get_context_for_parser()
+        parsed = await ai_service.parse_schedule(text, context_str)
         
         if parsed.get('lang'):
-            voice_handler.set_language(parsed['lang'])
+            context.set_language(parsed['lang'])
         
         if context:
             event = context.merge(parsed)
@@ -196,10 +362,10 @@ def _parse_schedule(text: str, context=None) -> tuple[dict | None, str | None]:
     
     except ScheduleParseError as spe:
         if spe.field == "api_error":
-            return None, _get_message('error')
+            return None, _get_message('error', context.reply_language)
         
         if spe.partial_data and spe.partial_data.get('lang'):
-            voice_handler.set_language(spe.partial_data['lang'])
+            context.set_language(spe.partial_data['lang'])
         
         if context and spe.partial_data:
             event = context.merge(spe.partial_data)
@@ -213,30 +379,42 @@ def _parse_schedule(text: str, context=None) -> tuple[dict | None, str | None]:
         print(f"Unexpected error type: {type(e).__name__}")
         print(f"Unexpected error: {e}")
         traceback.print_exc()
-        return None, _get_message('error')
+        return None, _get_message('error', context.reply_language)
 
 
-def _check_calendar_login() -> tuple[bool, str | None]:
+def _check_calendar_login(lang: str) -> tuple[bool, str | None]:
     if not calendar_automation.is_logged_in:
-        return False, _get_message('login')
+        return False, _get_message('login', lang)
     return True, None
 
 
-async def _create_calendar_event(event: dict, context=None) -> tuple[bool, str | None]:
+async def _create_calendar_event(
+    event: dict,
+    context=None,
+    lang: str = 'en',
+    show_calendar: bool | None = None
+) -> tuple[bool, str | None, str | None]:
     """
     Create event in Google Calendar.
-    Returns (True, success_message) on success, (False, error_message) on failure.
+    Returns (True, success_message, None) on success, (False, error_message, preview_url) on failure;
+    preview_url points at a screenshot of the day when the slot was taken.
+    show_calendar overrides SHOW_AFTER_CREATE for this request.
     """
     try:
-        is_ready, error = _check_calendar_login()
+        is_ready, error = _check_calendar_login(lang)
         if not is_ready:
-            return False, error
+            return False, error, None
         
-        # Fetch existing events for the date
-        existing_events = await calendar_automation.get_events_for_date(event['start_time'])
+        # Availability comes from the sync-filled cache; a stale or missing day is re-scraped first
+        existing_events = await calendar_automation.get_events_for_date(
+            event['start_time'], priority=Priority.WRITE
+        )
+        if existing_events is None:
+            # Never book against a day we couldn't read
+            return False, _get_message('error', lang), None
         
-        # Check for conflicts using AI
-        is_available, conflict_info = ai_service.check_conflict(
+        # Check for conflicts locally, falling back to AI for labels we can't parse
+        is_available, conflict_info = await conflict_engine.check_conflict(
             existing_events,
             event['start_time'],
             event['end_time']
@@ -246,36 +424,67 @@ async def _create_calendar_event(event: dict, context=None) -> tuple[bool, str |
             if context:
                 context.clear_for_reschedule()
             
-            await calendar_automation.show_calendar_date(event['start_time'])
-            time_str = _format_time(event['start_time'])
-            return False, _get_message('conflict', time=time_str, event=conflict_info or '')
+            # Show the day as an image captured headlessly, rather than popping up a browser window
+            calendar_automation.prefetch_day_preview(event['start_time'])
+            preview_url = f"/calendar/preview?date={event['start_time']:%Y-%m-%d}"
+            time_str = _format_time(event['start_time'], lang)
+            return False, _get_message('conflict', lang, time=time_str, event=conflict_info or ''), preview_url
         
         # Create event
-        success= await calendar_automation.create_event(
-            event['title'], event['start_time'], event['end_time']
+        success, event_id = await calendar_automation.create_event(
+            event['title'], event['start_time'], event['end_time'], show=show_calendar
         )
         
+        if success is None:
+            # Save was clicked but nothing confirmed it: don't claim a booking, and don't invite a duplicate
+            if context:
+                context.clear()
+            calendar_sync.request_refresh(event['start_time'])
+            time_str = _format_time(event['start_time'], lang)
+            return False, _get_message('unconfirmed', lang, title=event['title'], time=time_str), None
+        
         if success:
             if context:
                 context.clear()
-            time_str = _format_time(event['start_time'])
-            return True, _get_message('success', title=event['title'], time=time_str)
+            if event_id is None:
+                # Creation wasn't confirmed with an id, so the cache was invalidated instead of updated
+                calendar_sync.request_refresh(event['start_time'])
+            time_str = _format_time(event['start_time'], lang)
+            return True, _get_message('success', lang, title=event['title'], time=time_str), None
         else:
-            return False, _get_message('error')
+            return False, _get_message('error', lang), None
     
     except Exception as e:
         print(f"Calendar error: {e}")
-        return False, _get_message('error')
+        return False, _get_message('error', lang), None
 
 
-def _build_response(message: str, success: bool, transcript: str = "", with_audio: bool = True):
+def _build_response(
+    message: str,
+    success: bool,
+    transcript: str = "",
+    with_audio: bool = True,
+    lang: str = 'en',
+    preview_url: str | None = None
+):
     response = {
         "transcript": transcript,
         "message": message,
         "success": success,
     }
+    if preview_url:
+        response["preview_url"] = preview_url
     
-    if with_audio:
-        response["audio_url"] = voice_handler.text_to_speech(message)
+    if with_audio and AUDIO_STREAMING:
+        response["audio_url"] = voice_handler.stream_url(message, lang)
+    elif with_audio and AUDIO_DEFERRED:
+        # Cached phrases resolve instantly; everything else is synthesized after we respond
+        audio_url = voice_handler.cached_url(message, lang)
+        if audio_url:
+            response["audio_url"] = audio_url
+        else:
+            response["audio_ticket"] = voice_handler.defer_speech(message, lang)
+    elif with_audio:
+        response["audio_url"] = voice_handler.text_to_speech(message, lang=lang)
     
     return response
\ No newline at end of file
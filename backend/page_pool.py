@@ -0,0 +1,193 @@
+"""
+Page Pool - a fixed number of pages in the authenticated browser context,
+leased one per browser job so concurrent requests never share a page.
+Waiting jobs are served by priority: interactive writes, then interactive reads,
+then background refreshes.
+"""
+import asyncio
+import itertools
+import os
+import time
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import Optional
+
+from playwright.async_api import BrowserContext, Page
+
+
+class Priority(IntEnum):
+    WRITE = 0       # a live user's booking
+    READ = 1        # a live user's availability check
+    BACKGROUND = 2  # sync worker refreshes
+
+
+class PagePool:
+    """
+    Leases pages to jobs by priority (FIFO within a class). Pages are opened lazily
+    up to size; rebinding to a new context retires every page of the old one.
+    """
+
+    SIZE = 3
+    # An interactive waiter moves up one class for every AGING_SECONDS it has waited, so reads
+    # aren't starved by writes. Background waiters don't age: they never outrank a live request.
+    AGING_SECONDS = 10.0
+    # Background jobs never take the last free page(s), keeping them for interactive work
+    INTERACTIVE_RESERVE = 1
+
+    def __init__(self, size: int = None):
+        size = size or int(os.getenv("BROWSER_PAGES", self.SIZE))
+        # The reserve needs a page of its own, or a 1-page pool would hand it to background work
+        self.size = max(size, self.INTERACTIVE_RESERVE + 1)
+        if self.size != size:
+            print(f"Page pool raised to {self.size} pages to keep {self.INTERACTIVE_RESERVE} for live requests")
+        self._context: Optional[BrowserContext] = None
+        self._generation = 0
+        self._idle: list[Page] = []
+        self._open = 0  # pages of the current context, idle or leased
+        self._in_use = 0
+        self._exclusive = False
+        self._changed = asyncio.Condition()
+        # [priority, seq, enqueued_at, future]
+        self._waiters: list[list] = []
+        self._seq = itertools.count()
+
+        self.leases = 0
+        self.max_waiting = 0
+        self._class_stats = {
+            priority: {'leases': 0, 'cancelled': 0, 'wait_ms_total': 0.0, 'wait_ms_max': 0.0, 'run_ms_total': 0.0}
+            for priority in Priority
+        }
+
+    async def bind(self, context: Optional[BrowserContext]):
+        """Switch to a new context (or None while the browser is down). Leased pages are dropped on release."""
+        self._generation += 1
+        self._context = context
+        self._idle = []
+        self._open = 0
+        self._dispatch()
+
+    @asynccontextmanager
+    async def lease(self, priority: Priority = Priority.READ):
+        """Wait for a free page and hold it for the duration of a job."""
+        started = time.perf_counter()
+        future = asyncio.get_running_loop().create_future()
+        waiter = [priority, next(self._seq), started, future]
+        self._waiters.append(waiter)
+        self.max_waiting = max(self.max_waiting, len(self._waiters))
+        self._dispatch()
+
+        try:
+            page, generation, context = await future
+        except asyncio.CancelledError:
+            # Cancelled while queued; if a page was granted in the same instant, hand it back
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            elif future.done() and not future.cancelled():
+                granted_page, generation, _ = future.result()
+                await self._release(granted_page, generation)
+            self._class_stats[priority]['cancelled'] += 1
+            raise
+        self._record_wait(priority, time.perf_counter() - started)
+
+        leased_at = time.perf_counter()
+        try:
+            if page is None:
+                page = await context.new_page()
+            yield page
+        finally:
+            self._class_stats[priority]['run_ms_total'] += (time.perf_counter() - leased_at) * 1000
+            await self._release(page, generation)
+
+    @asynccontextmanager
+    async def exclusive(self):
+        """Hold off new leases and wait for running jobs to finish (e.g. before relaunching the browser)."""
+        async with self._changed:
+            await self._changed.wait_for(lambda: not self._exclusive)
+            self._exclusive = True
+            await self._changed.wait_for(lambda: self._in_use == 0)
+        try:
+            yield
+        finally:
+            async with self._changed:
+                self._exclusive = False
+                self._changed.notify_all()
+            self._dispatch()
+
+    def _dispatch(self):
+        """Grant free pages to the best-ranked waiters."""
+        self._waiters = [w for w in self._waiters if not w[3].done()]
+        while self._waiters and not self._exclusive and self._context is not None:
+            free = len(self._idle) + (self.size - self._open)
+            if free <= 0:
+                return
+            now = time.perf_counter()
+            eligible = [
+                w for w in self._waiters
+                if w[0] != Priority.BACKGROUND or free > self.INTERACTIVE_RESERVE
+            ]
+            if not eligible:
+                return
+            waiter = min(eligible, key=lambda w: (self._rank(w, now), w[1]))
+            self._waiters.remove(waiter)
+
+            page = self._idle.pop() if self._idle else None
+            if page is None:
+                self._open += 1
+            self._in_use += 1
+            waiter[3].set_result((page, self._generation, self._context))
+
+    def _rank(self, waiter: list, now: float) -> float:
+        """Effective priority class: interactive waiters age toward WRITE but never past it."""
+        priority, _, enqueued_at, _ = waiter
+        if priority == Priority.BACKGROUND:
+            return priority
+        return max(Priority.WRITE, priority - (now - enqueued_at) / self.AGING_SECONDS)
+
+    async def _release(self, page: Optional[Page], generation: int):
+        stale = None
+        self._in_use -= 1
+        usable = page is not None and not page.is_closed()
+        if generation == self._generation:
+            if usable:
+                self._idle.append(page)
+            else:
+                self._open -= 1
+        elif usable:
+            stale = page
+        self._dispatch()
+        async with self._changed:
+            self._changed.notify_all()
+        if stale is not None:
+            try:
+                await stale.close()
+            except Exception:
+                pass
+
+    def _record_wait(self, priority: Priority, seconds: float):
+        ms = seconds * 1000
+        stats = self._class_stats[priority]
+        self.leases += 1
+        stats['leases'] += 1
+        stats['wait_ms_total'] += ms
+        stats['wait_ms_max'] = max(stats['wait_ms_max'], ms)
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "open": self._open,
+            "in_use": self._in_use,
+            "queue_depth": len(self._waiters),
+            "max_queue_depth": self.max_waiting,
+            "leases": self.leases,
+            "classes": {
+                priority.name.lower(): {
+                    "leases": s['leases'],
+                    "waiting": sum(1 for w in self._waiters if w[0] == priority),
+                    "cancelled": s['cancelled'],
+                    "avg_wait_ms": round(s['wait_ms_total'] / s['leases'], 1) if s['leases'] else 0.0,
+                    "max_wait_ms": round(s['wait_ms_max'], 1),
+                    "avg_run_ms": round(s['run_ms_total'] / s['leases'], 1) if s['leases'] else 0.0,
+                }
+                for priority, s in self._class_stats.items()
+            },
+        }
@@ -0,0 +1,114 @@
+"""
+Page Readiness - waits on concrete page signals (selectors, URL changes, DOM quiescence)
+with upper bounds, instead of fixed sleeps, and records how long each wait took.
+"""
+import time
+from typing import Awaitable, Callable
+
+from playwright.async_api import Page, TimeoutError as PlaywrightTimeoutError
+
+
+# Resolves true once the node matching selector (the whole body if none) has had no children
+# added or removed for quietMs, false if timeoutMs passes first. Attribute and text changes
+# (clocks, hover states) are ignored so the page can actually go quiet.
+_QUIESCENCE_JS = """
+    ([selector, quietMs, timeoutMs]) => new Promise(resolve => {
+        const root = (selector && document.querySelector(selector)) || document.body;
+        let quietTimer;
+        const finish = (quiet) => {
+            observer.disconnect();
+            clearTimeout(quietTimer);
+            clearTimeout(capTimer);
+            resolve(quiet);
+        };
+        const observer = new MutationObserver(() => {
+            clearTimeout(quietTimer);
+            quietTimer = setTimeout(() => finish(true), quietMs);
+        });
+        observer.observe(root, {childList: true, subtree: true});
+        quietTimer = setTimeout(() => finish(true), quietMs);
+        const capTimer = setTimeout(() => finish(false), timeoutMs);
+    })
+"""
+
+
+class PageReadiness:
+    """Bounded waits for Google Calendar page states, with per-signal timing stats."""
+
+    # The time grid inside the app shell; [role="main"] alone exists before any events render
+    GRID_SELECTOR = '[role="main"] [role="grid"]'
+    QUIET_MS = 150
+
+    def __init__(self, event_selectors: list[str] = None):
+        # Event chip selectors: any chip appearing also means the grid has rendered
+        self.event_selectors = event_selectors or []
+        # name -> {count, timeouts, total_ms, max_ms, last_ms}
+        self._stats: dict[str, dict] = {}
+
+    async def wait_for_grid(self, page: Page, timeout: int = 5000) -> bool:
+        """
+        Wait for the event grid (or an event chip), then for chips to stop being added.
+        Returns False only if the grid never appeared; a quiescence timeout is just recorded.
+        """
+        ready = ', '.join([self.GRID_SELECTOR, *self.event_selectors])
+        found = await self.wait_for_selector(page, 'grid', ready, timeout)
+        if not found:
+            return False
+        await self.wait_for_quiet(page, 'grid_quiet', selector=self.GRID_SELECTOR, timeout=2000)
+        return True
+
+    async def wait_for_selector(self, page: Page, name: str, selector: str, timeout: int = 5000):
+        """Wait for a visible element; returns it, or False on timeout."""
+        return await self._measure(name, lambda: page.wait_for_selector(selector, state='visible', timeout=timeout))
+
+    async def wait_for_url(self, page: Page, name: str, predicate: Callable[[str], bool], timeout: int = 5000) -> bool:
+        result = await self._measure(name, lambda: page.wait_for_url(predicate, timeout=timeout))
+        return result is not False
+
+    async def wait_for_quiet(
+        self,
+        page: Page,
+        name: str,
+        selector: str = None,
+        quiet_ms: int = None,
+        timeout: int = 2000
+    ) -> bool:
+        """MutationObserver-based quiescence: no nodes added/removed under selector for quiet_ms."""
+        quiet_ms = quiet_ms or self.QUIET_MS
+        quiet = await self._measure(name, lambda: page.evaluate(_QUIESCENCE_JS, [selector, quiet_ms, timeout]))
+        if quiet is False:
+            self._stats[name]['timeouts'] += 1
+        return bool(quiet)
+
+    async def _measure(self, name: str, wait: Callable[[], Awaitable]):
+        """Run a wait, timing it. Playwright timeouts are recorded and return False."""
+        stats = self._stats.setdefault(
+            name, {'count': 0, 'timeouts': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'last_ms': 0.0}
+        )
+        started = time.perf_counter()
+        try:
+            result = await wait()
+            if result is None:
+                result = True
+        except PlaywrightTimeoutError:
+            stats['timeouts'] += 1
+            result = False
+        finally:
+            ms = (time.perf_counter() - started) * 1000
+            stats['count'] += 1
+            stats['total_ms'] += ms
+            stats['max_ms'] = max(stats['max_ms'], ms)
+            stats['last_ms'] = ms
+        return result
+
+    def stats(self) -> dict:
+        return {
+            name: {
+                "count": s['count'],
+                "timeouts": s['timeouts'],
+                "avg_ms": round(s['total_ms'] / s['count'], 1) if s['count'] else 0.0,
+                "max_ms": round(s['max_ms'], 1),
+                "last_ms": round(s['last_ms'], 1),
+            }
+            for name, s in self._stats.items()
+        }
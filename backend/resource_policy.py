@@ -0,0 +1,120 @@
+"""
+Resource Policy - optional request blocking for the headless worker context
+(images, fonts, media, analytics) and per-navigation byte/time metrics.
+"""
+import os
+import re
+import weakref
+
+from playwright.async_api import BrowserContext, Page, Request, Response, Route
+
+
+class ResourcePolicy:
+    """Aborts non-essential requests on a context and measures what each navigation downloads."""
+
+    # Images, fonts and media, recognised by extension so only those URLs are routed
+    BLOCKED_EXTENSIONS = ('png', 'jpg', 'jpeg', 'gif', 'webp', 'svg', 'ico', 'woff', 'woff2', 'ttf', 'otf', 'mp4', 'webm', 'mp3')
+    BLOCKED_HOSTS = (
+        'google-analytics.com',
+        'googletagmanager.com',
+        'doubleclick.net',
+        'play.google.com',  # client telemetry (/log)
+        'lh3.googleusercontent.com',  # avatars
+    )
+
+    def __init__(self, enabled: bool = None):
+        self.enabled = enabled if enabled is not None else os.getenv("BLOCK_RESOURCES", "").lower() in ("1", "true", "yes")
+
+        self.navigations = 0
+        self.nav_ms_total = 0.0
+        self.bytes_total = 0
+        self.requests_total = 0
+        self.blocked_total = 0
+        # Per page: counters for the navigation in progress (until that page navigates again)
+        self._current: weakref.WeakKeyDictionary[Page, dict] = weakref.WeakKeyDictionary()
+        self._last = None
+
+    async def attach(self, context: BrowserContext, block: bool = True):
+        """
+        Start measuring a context; also install the blocking route when enabled and block is True.
+        The route matches only blocked URLs, so everything else never passes through Python.
+        Playwright turns off the HTTP cache for a context with any route, which is why
+        nothing is routed unless blocking is on.
+        """
+        context.on('response', self._on_response)
+        if self.enabled and block:
+            await context.route(self._blocked_pattern(), self._handle_route)
+            print("Resource blocking enabled for worker context")
+
+    @classmethod
+    def _blocked_pattern(cls) -> re.Pattern:
+        hosts = '|'.join(re.escape(host) for host in cls.BLOCKED_HOSTS)
+        extensions = '|'.join(cls.BLOCKED_EXTENSIONS)
+        return re.compile(
+            rf'^[a-z]+://(?:[^/?#]*\.)?(?:{hosts})(?:[/:?#]|$)'
+            rf'|\.(?:{extensions})(?:[?#]|$)',
+            re.IGNORECASE
+        )
+
+    def begin_navigation(self, page: Page, url: str):
+        previous = self._current.get(page)
+        if previous is not None:
+            self._last = previous
+        self._current[page] = self._new_navigation(url)
+
+    def end_navigation(self, page: Page, seconds: float):
+        ms = seconds * 1000
+        self._current[page]['ms'] = ms
+        self.navigations += 1
+        self.nav_ms_total += ms
+
+    def _navigation_for(self, request: Request):
+        try:
+            return self._current.get(request.frame.page)
+        except Exception:
+            return None  # Service-worker requests have no frame
+
+    async def _handle_route(self, route: Route):
+        # Only blocked URLs are routed here
+        navigation = self._navigation_for(route.request)
+        if navigation is not None:
+            navigation['blocked'] += 1
+        self.blocked_total += 1
+        await route.abort('blockedbyclient')
+
+    def _on_response(self, response: Response):
+        # content-length from the already-received headers: no extra round trip per request.
+        # Chunked responses don't declare one and count as 0 bytes.
+        try:
+            size = int(response.headers.get('content-length', 0))
+        except ValueError:
+            size = 0
+        navigation = self._navigation_for(response.request)
+        if navigation is not None:
+            navigation['requests'] += 1
+            navigation['bytes'] += size
+        self.requests_total += 1
+        self.bytes_total += size
+
+    @staticmethod
+    def _new_navigation(url: str = None) -> dict:
+        return {'url': url, 'ms': None, 'requests': 0, 'bytes': 0, 'blocked': 0}
+
+    def stats(self) -> dict:
+        last = self._last or self._new_navigation()
+        return {
+            "enabled": self.enabled,
+            "navigations": self.navigations,
+            "avg_nav_ms": round(self.nav_ms_total / self.navigations, 1) if self.navigations else 0.0,
+            "avg_bytes": self.bytes_total // self.navigations if self.navigations else 0,
+            "bytes_total": self.bytes_total,
+            "requests_total": self.requests_total,
+            "blocked_total": self.blocked_total,
+            "last": {
+                "url": last['url'],
+                "nav_ms": round(last['ms'], 1) if last['ms'] is not None else None,
+                "requests": last['requests'],
+                "bytes": last['bytes'],
+                "blocked": last['blocked'],
+            },
+        }
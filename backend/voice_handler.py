@@ -3,74 +3,375 @@ Voice Handler - OpenAI Whisper STT and gTTS
 """
 import os
 import io
-from pathlib import Path
-from datetime import datetime
-from openai import OpenAI
+import asyncio
+import hashlib
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Iterator
+from openai import AsyncOpenAI
 from gtts import gTTS
 
+from audio_store import AudioStore, MemoryAudioStore
+from conversation_context import DEFAULT_LANGUAGE
+
+# Map Whisper lang codes to gTTS codes
+WHISPER_TO_GTTS = {
+    'en': 'en',
+    'english': 'en',
+    'zh': 'zh-CN',
+    'chinese': 'zh-CN',
+}
+
+# ISO-639-1 hints Whisper accepts for each session language
+GTTS_TO_WHISPER = {
+    'en': 'en',
+    'zh-CN': 'zh',
+    'zh-TW': 'zh',
+    'yue': 'zh',
+}
+
+
+class TTSCache:
+    """LRU index of synthesized audio files, keyed on (normalized text, language)."""
+    
+    def __init__(self, store: AudioStore, max_entries: int = 256):
+        self.store = store
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[str, str], str] = OrderedDict()
+        self._pinned: set[tuple[str, str]] = set()
+        # text_to_speech may run in worker threads (see VoiceHandler.text_to_speech_async)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def make_key(text: str, lang: str) -> tuple[str, str]:
+        return ' '.join(text.split()).casefold(), lang
+    
+    @staticmethod
+    def filename_for(key: tuple[str, str]) -> str:
+        digest = hashlib.sha1(f"{key[1]}\0{key[0]}".encode('utf-8')).hexdigest()[:20]
+        return f"tts_{digest}.mp3"
+    
+    def relpath_for(self, key: tuple[str, str]) -> str:
+        return self.store.relpath_for(self.filename_for(key))
+    
+    def get(self, key: tuple[str, str], record_stats: bool = True) -> str | None:
+        with self._lock:
+            relpath = self._entries.get(key) or self.relpath_for(key)
+            if not self.store.exists(relpath):
+                self._entries.pop(key, None)
+                self.misses += record_stats
+                return None
+            
+            # Files left over from a previous run are adopted back into the index
+            self._entries[key] = relpath
+            self._entries.move_to_end(key)
+            self.hits += record_stats
+            self._evict()
+        self.store.touch(relpath)
+        return relpath
+    
+    def put(self, key: tuple[str, str], relpath: str):
+        with self._lock:
+            self._entries[key] = relpath
+            self._entries.move_to_end(key)
+            self._evict()
+    
+    def pin(self, key: tuple[str, str]):
+        """Exempt an entry from LRU eviction and GC (used for pre-rendered static messages)."""
+        with self._lock:
+            self._pinned.add(key)
+        self.store.protect(self.relpath_for(key))
+    
+    def unpin_all(self):
+        with self._lock:
+            pinned, self._pinned = self._pinned, set()
+        for key in pinned:
+            self.store.unprotect(self.relpath_for(key))
+    
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "pinned": len(self._pinned),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+    
+    def _evict(self):
+        if len(self._entries) <= self.max_entries:
+            return
+        evictable = [k for k in self._entries if k not in self._pinned]
+        while len(self._entries) > self.max_entries and evictable:
+            self.store.remove(self._entries.pop(evictable.pop(0)))
+
 
 class VoiceHandler:
     
-    def __init__(self, output_dir: str = 'audio'):
+    MAX_CONCURRENT_TRANSCRIPTIONS = 4
+    MAX_CONCURRENT_PRERENDERS = 4
+    TTS_CACHE_SIZE = 256
+    MAX_PENDING_STREAMS = 256
+    MAX_AUDIO_TICKETS = 256
+    
+    def __init__(
+        self,
+        output_dir: str = 'audio',
+        max_concurrent_transcriptions: int = None,
+        tts_cache_size: int = None,
+        audio_store: AudioStore = None,
+        memory_store: MemoryAudioStore = None
+    ):
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("OPENAI_API_KEY not found in .env")
         
-        self.client = OpenAI(api_key=api_key)
+        self.client = AsyncOpenAI(api_key=api_key)
         self.output_dir = output_dir
-        self.language = 'en'
-        Path(output_dir).mkdir(parents=True, exist_ok=True)
+        # Bound in-flight Whisper uploads so a burst of users can't exhaust the connection pool
+        max_concurrent_transcriptions = max_concurrent_transcriptions or int(
+            os.getenv("MAX_CONCURRENT_TRANSCRIPTIONS", self.MAX_CONCURRENT_TRANSCRIPTIONS)
+        )
+        self._transcribe_semaphore = asyncio.Semaphore(max_concurrent_transcriptions)
+        self.audio_store = audio_store or AudioStore(output_dir)
+        self.tts_cache = TTSCache(self.audio_store, max_entries=tts_cache_size or self.TTS_CACHE_SIZE)
+        # When set, reply audio lives only in RAM and is served by the /audio/{audio_id} route
+        self.memory_store = memory_store
+        self._streams: OrderedDict[str, tuple[str, str]] = OrderedDict()
+        self._streams_lock = threading.Lock()
+        self._tickets: OrderedDict[str, asyncio.Task] = OrderedDict()
         print(f"VoiceHandler initialized.")
     
-    def set_language(self, lang: str):
-        if lang in ['en', 'zh-CN', 'zh-TW', 'yue']:
-            self.language = lang
-    
-    def text_to_speech(self, text: str, filename: str = None, lang: str = None) -> str:
+    def text_to_speech(
+        self,
+        text: str,
+        filename: str = None,
+        lang: str = None,
+        record_stats: bool = True
+    ) -> str:
+        """
+        Synthesize text to an MP3 in the audio store and return its /audio URL.
+        Without an explicit filename, audio is content-addressed and served from the TTS cache.
+        record_stats=False keeps the lookup out of the cache hit/miss counters (warm-up).
+        """
         try:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S%f')[:-3]
-            filename = filename or f"tts_{timestamp}.mp3"
-            filepath = os.path.join(self.output_dir, filename)
+            lang = lang or DEFAULT_LANGUAGE
             
-            lang = lang or self.language
+            if filename is None:
+                cached = self.cached_url(text, lang, record_stats)
+                if cached:
+                    return cached
+                buffer = io.BytesIO()
+                gTTS(text=text, lang=lang).write_to_fp(buffer)
+                return self._store_audio(self.tts_cache.make_key(text, lang), buffer.getvalue())
             
-            tts = gTTS(text=text, lang=lang)
-            tts.save(filepath)
+            relpath = self.audio_store.relpath_for(filename)
+            filepath = str(self.audio_store.prepare(relpath))
+            gTTS(text=text, lang=lang).save(filepath)
+            self.audio_store.record_write(relpath)
             
             print(f"TTS saved: {filepath}")
-            return f"/audio/{filename}"
+            return f"/audio/{relpath}"
             
         except Exception as e:
             print(f"TTS error: {e}")
             return None
     
-    def transcribe(self, audio_data: bytes, filename: str = "audio.webm") -> tuple[str, str]:
+    def cached_url(self, text: str, lang: str = None, record_stats: bool = True) -> str | None:
+        """URL of already-synthesized audio for text, or None."""
+        key = self.tts_cache.make_key(text, lang or DEFAULT_LANGUAGE)
+        
+        if self.memory_store is not None:
+            audio_id = self.tts_cache.filename_for(key)
+            found = self.memory_store.get(audio_id, record_stats) is not None
+            return f"/audio/{audio_id}" if found else None
+        
+        relpath = self.tts_cache.get(key, record_stats)
+        return f"/audio/{relpath}" if relpath else None
+    
+    def stream_url(self, text: str, lang: str = None) -> str:
+        """
+        URL that plays text: the cached audio if present, otherwise a streaming ticket
+        whose audio is synthesized chunk by chunk when fetched.
+        """
+        lang = lang or DEFAULT_LANGUAGE
+        cached = self.cached_url(text, lang)
+        if cached:
+            return cached
+        
+        stream_id = uuid.uuid4().hex
+        with self._streams_lock:
+            self._streams[stream_id] = (text, lang)
+            while len(self._streams) > self.MAX_PENDING_STREAMS:
+                self._streams.popitem(last=False)
+        return f"/audio/stream/{stream_id}"
+    
+    def stream_speech(self, stream_id: str) -> Iterator[bytes] | None:
+        """MP3 chunks for a streaming ticket, or None if the ticket is unknown."""
+        with self._streams_lock:
+            ticket = self._streams.get(stream_id)
+        if ticket is None:
+            return None
+        return self._stream_chunks(*ticket)
+    
+    def _stream_chunks(self, text: str, lang: str) -> Iterator[bytes]:
+        key = self.tts_cache.make_key(text, lang)
+        cached = self._read_cached(key)
+        if cached is not None:
+            yield cached
+            return
+        
+        # gTTS splits text into sentence-sized parts and fetches each separately
+        chunks = []
+        try:
+            for chunk in gTTS(text=text, lang=lang).stream():
+                chunks.append(chunk)
+                yield chunk
+        except Exception as e:
+            print(f"TTS stream error: {e}")
+            return
+        self._store_audio(key, b''.join(chunks))
+    
+    def _read_cached(self, key: tuple[str, str]) -> bytes | None:
+        if self.memory_store is not None:
+            return self.memory_store.get(self.tts_cache.filename_for(key))
+        
+        relpath = self.tts_cache.get(key)
+        if relpath is None:
+            return None
+        try:
+            return self.audio_store.path(relpath).read_bytes()
+        except OSError:
+            return None
+    
+    def _store_audio(self, key: tuple[str, str], data: bytes) -> str:
+        """Put synthesized audio into the active store and return its URL."""
+        if self.memory_store is not None:
+            audio_id = self.tts_cache.filename_for(key)
+            self.memory_store.put(audio_id, data)
+            print(f"TTS kept in memory: {audio_id}")
+            return f"/audio/{audio_id}"
+        
+        relpath = self.tts_cache.relpath_for(key)
+        filepath = self.audio_store.prepare(relpath)
+        # Write then rename so a failed write never leaves a truncated cache entry
+        partial = filepath.with_name(filepath.name + '.part')
+        partial.write_bytes(data)
+        os.replace(partial, filepath)
+        self.audio_store.record_write(relpath)
+        self.tts_cache.put(key, relpath)
+        
+        print(f"TTS saved: {filepath}")
+        return f"/audio/{relpath}"
+    
+    async def text_to_speech_async(
+        self,
+        text: str,
+        filename: str = None,
+        lang: str = None,
+        record_stats: bool = True
+    ) -> str:
+        """Run text_to_speech in a worker thread so gTTS network I/O doesn't block the loop."""
+        return await asyncio.to_thread(self.text_to_speech, text, filename, lang, record_stats)
+    
+    def defer_speech(self, text: str, lang: str = None) -> str:
+        """
+        Start synthesizing text in the background and return a ticket for it.
+        Must be called from the event loop; resolve the ticket with wait_for_speech.
+        """
+        lang = lang or DEFAULT_LANGUAGE
+        ticket = uuid.uuid4().hex
+        self._tickets[ticket] = asyncio.create_task(self.text_to_speech_async(text, lang=lang))
+        
+        while len(self._tickets) > self.MAX_AUDIO_TICKETS:
+            _, task = self._tickets.popitem(last=False)
+            task.cancel()
+        return ticket
+    
+    async def wait_for_speech(self, ticket: str, timeout: float) -> tuple[bool, str | None]:
+        """
+        Wait up to timeout seconds for a deferred synthesis.
+        Returns (done, audio_url); raises KeyError for unknown tickets.
+        """
+        task = self._tickets[ticket]
+        done, _ = await asyncio.wait({task}, timeout=timeout)
+        if not done:
+            return False, None
+        if task.cancelled() or task.exception():
+            return True, None
+        return True, task.result()
+    
+    async def prerender(self, texts: list[tuple[str, str]]) -> int:
+        """
+        Synthesize (text, lang) pairs, at most MAX_CONCURRENT_PRERENDERS at a time, and pin
+        them in the TTS cache. Warm-up lookups don't count toward the cache hit rate.
+        Returns the number of phrases rendered successfully.
+        """
+        self.tts_cache.unpin_all()
+        if self.memory_store is not None:
+            self.memory_store.unpin_all()
+        
+        for text, lang in texts:
+            key = self.tts_cache.make_key(text, lang)
+            if self.memory_store is not None:
+                self.memory_store.pin(self.tts_cache.filename_for(key))
+            else:
+                self.tts_cache.pin(key)
+        
+        semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_PRERENDERS)
+        
+        async def render(text: str, lang: str) -> str | None:
+            async with semaphore:
+                return await self.text_to_speech_async(text, lang=lang, record_stats=False)
+        
+        urls = await asyncio.gather(*(render(text, lang) for text, lang in texts))
+        return sum(1 for url in urls if url)
+    
+    async def transcribe(
+        self,
+        audio_data: bytes,
+        filename: str = "audio.webm",
+        language: str = None
+    ) -> tuple[str, str]:
+        """
+        Transcribe audio with Whisper. Returns (text, lang) where lang is a gTTS code.
+        A known session language is passed as Whisper's hint, skipping auto-detection.
+        """
         try:
             audio_file = io.BytesIO(audio_data)
             audio_file.name = filename
             
-            response = self.client.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_file,
-                response_format="verbose_json"
-            )
+            options = {}
+            if language in GTTS_TO_WHISPER:
+                options['language'] = GTTS_TO_WHISPER[language]
+            
+            async with self._transcribe_semaphore:
+                response = await self.client.audio.transcriptions.create(
+                    model="whisper-1",
+                    file=audio_file,
+                    response_format="verbose_json",
+                    **options
+                )
             
             text = response.text.strip()
             detected_lang = response.language or 'en'
             
-            # Map Whisper lang codes to gTTS codes
-            lang_map = {
-                'en': 'en',
-                'english': 'en',
-                'zh': 'zh-CN',
-                'chinese': 'zh-CN',
-            }
-            lang = lang_map.get(detected_lang, 'en')
-            self.set_language(lang)
+            if options:
+                # Keep the finer-grained session language (e.g. zh-TW) when we hinted
+                lang = language
+            else:
+                lang = WHISPER_TO_GTTS.get(detected_lang, DEFAULT_LANGUAGE)
             
             print(f"Transcribed: {text} (detected: {detected_lang} → {lang})")
-            return text
+            return text, lang
             
         except Exception as e:
             print(f"Transcription error: {e}")
-            raise
\ No newline at end of file
+            raise
+    
+    async def close(self):
+        await self.client.close()
\ No newline at end of file
@@ -75,6 +75,24 @@ function VoiceCalendarAssistance() {
         }
     };
 
+    // Deferred audio: long-poll the ticket until the backend finishes synthesis
+    const resolveAudioUrl = async (data) => {
+        if (data.audio_url || !data.audio_ticket) {
+            return data.audio_url;
+        }
+        for (let attempt = 0; attempt < 5; attempt++) {
+            const res = await fetch(`${API_BASE}/audio/ticket/${data.audio_ticket}?timeout=10`);
+            if (!res.ok) {
+                return null;
+            }
+            const ticket = await res.json();
+            if (ticket.ready) {
+                return ticket.audio_url;
+            }
+        }
+        return null;
+    };
+
     const stopAudio = () => {
         if (currentAudioRef.current) {
             currentAudioRef.current.pause();
@@ -85,10 +103,10 @@ function VoiceCalendarAssistance() {
 
     const playGreeting = async () => {
         try {
-            const res = await fetch(`${API_BASE}/start-conversation`);
+            const res = await fetch(`${API_BASE}/start-conversation`, { credentials: 'include' });
             const data = await res.json();
             addToHistory('Assistant', data.message);
-            await playAudio(data.audio_url);
+            await playAudio(await resolveAudioUrl(data));
             setGreeted(true);
         } catch (e) {
             console.error('Greeting error:', e);
@@ -97,7 +115,7 @@ function VoiceCalendarAssistance() {
 
     const checkCalendarLogin = async () => {
         try {
-            const res = await fetch(`${API_BASE}/login-status`);
+            const res = await fetch(`${API_BASE}/login-status`, { credentials: 'include' });
             const data = await res.json();
             
             if (!data.logged_in) {
@@ -115,8 +133,8 @@ function VoiceCalendarAssistance() {
         }
     };
 
-    const addToHistory = (role, message) => {
-        setConversationHistory(prev => [...prev, { role, message, time: new Date() }]);
+    const addToHistory = (role, message, preview = null) => {
+        setConversationHistory(prev => [...prev, { role, message, preview, time: new Date() }]);
     };
 
     const startRecording = async () => {
@@ -175,7 +193,8 @@ function VoiceCalendarAssistance() {
 
             const res = await fetch(`${API_BASE}/schedule`, {
                 method: 'POST',
-                body: formData
+                body: formData,
+                credentials: 'include'
             });
 
             const data = await res.json();
@@ -184,10 +203,12 @@ function VoiceCalendarAssistance() {
                 addToHistory('User', data.transcript);
             }
             
-            addToHistory('Assistant', data.message);
+            // On a conflict the backend sends a screenshot of the day instead of opening a browser
+            addToHistory('Assistant', data.message, data.preview_url);
             
-            if (data.audio_url) {
-                await playAudio(data.audio_url);
+            const audioUrl = await resolveAudioUrl(data);
+            if (audioUrl) {
+                await playAudio(audioUrl);
             }
         } catch (e) {
             const msg = 'Error processing audio';
@@ -256,6 +277,13 @@ function VoiceCalendarAssistance() {
                 {conversationHistory.map((item, i) => (
                     <div key={i} className={`history-item ${item.role}`}>
                         <strong>{item.role}:</strong> {item.message}
+                        {item.preview && (
+                            <img
+                                className="calendar-preview"
+                                src={`${API_BASE}${item.preview}`}
+                                alt="Calendar day view"
+                            />
+                        )}
                     </div>
                 ))}
             </div>